@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+End-to-end crawl benchmark: BASELINE, then COMPARE, against a local site.
+
+    python -m benchmarks.bench_crawl [pages] [--engine THREADED|ASYNC]
+        [--scope FULL|TARGETED] [--render stub|browser] [--deface 0.05] [--json]
+
+The site mirrors the URL mix of combined_domain_analysis.json (content
+pages, pagination, uploads, Elementor fragment links) and adds SPA
+shells, slow and erroring endpoints. Each mode runs through
+main.crawl_site() with MySQL replaced by a SQLite file
+(benchmarks/db_standin.py), inside a temporary directory so baselines/,
+diffs/ and everything under data/ (render cache, metrics, frontier
+journals, render decisions) stay out of the working tree. Each mode
+starts with an empty render cache.
+
+"--render stub" answers JS renders with the page's pre-rendered HTML so
+no browser is needed; "browser" uses Playwright.
+
+Reports pages/s, p50/p99 page latency (fetch + handling), JS renders,
+DB round-trips and, for COMPARE, changed vs unchanged pages.
+"""
+
+import argparse
+import contextlib
+import functools
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import main as crawl_main
+import crawler.compare_targets as compare_targets_mod
+import crawler.config as config_mod
+import crawler.frontier_journal as frontier_journal_mod
+import crawler.metrics as metrics_mod
+import crawler.render_cache as render_cache_mod
+import crawler.worker as worker_mod
+from benchmarks.db_standin import SQLiteStandIn, install
+from benchmarks.fixture_server import FixtureSite, load_profile
+from crawler.compare_engine import DEFACEMENT_INDEX, COMPARE_POOL
+from crawler.config import GLOBAL_WORKER_BUDGET
+from crawler.js_renderer import RENDER_STATS
+from crawler.render_advisor import RenderAdvisor
+from crawler.scheduler import WorkerBudget
+
+PROFILE = Path(__file__).resolve().parents[2] / "combined_domain_analysis.json"
+
+SITE_ID = 990001
+CUST_ID = 990
+
+
+class _StubRenderer:
+    """Stands in for JS_RENDERER: returns the fixture's post-JS HTML."""
+
+    def __init__(self, site):
+        self.site = site
+        self.renders = 0
+        self._lock = threading.Lock()
+
+    def render(self, url, timeout=None, metrics=None):
+        with self._lock:
+            self.renders += 1
+        return self.site.rendered(url)
+
+
+class _PageTimer:
+    """Wraps PageHandler.handle to record fetch + handling time per page."""
+
+    def __init__(self):
+        self.latencies = []
+        self._lock = threading.Lock()
+        original = worker_mod.PageHandler.handle
+        timer = self
+
+        def handle(handler, **kwargs):
+            try:
+                return original(handler, **kwargs)
+            finally:
+                elapsed = time.time() - kwargs["start"]
+                with timer._lock:
+                    timer.latencies.append(elapsed)
+
+        worker_mod.PageHandler.handle = handle
+
+    def reset(self):
+        with self._lock:
+            self.latencies = []
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _use_data_dir(workdir):
+    """Point every on-disk output the crawl writes under ``workdir``."""
+    data = Path(workdir) / "data"
+    config_mod.DATA_DIR = data
+    metrics_mod.METRICS_DIR = data / "metrics"
+    frontier_journal_mod.FRONTIER_DIR = data / "frontier"
+    compare_targets_mod.COMPARE_DISCOVERY_DIR = data / "compare_discovery"
+    # Learned render decisions must not leak between benchmark runs
+    crawl_main.RenderAdvisor = functools.partial(RenderAdvisor, directory=data / "render_decisions")
+    return data
+
+
+def _run_mode(mode, seed, args, db, timer, renders, data):
+    # Each mode starts with an empty render cache of its own
+    render_cache_mod.clear_render_cache()
+    render_cache_mod.RENDER_CACHE_DIR = data / "render_cache" / mode.lower()
+
+    crawl_main.CRAWL_MODE = mode
+    crawl_main.CRAWL_ENGINE = args.engine
+    crawl_main.COMPARE_SCOPE = args.scope
+    if mode == "COMPARE":
+        DEFACEMENT_INDEX.refresh()
+
+    timer.reset()
+    trips_before = db.round_trips
+    renders_before = renders()
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+
+    start = time.perf_counter()
+    with quiet:
+        result = crawl_main.crawl_site(
+            {"siteid": SITE_ID, "custid": CUST_ID, "url": seed},
+            WorkerBudget(GLOBAL_WORKER_BUDGET),
+        )
+    elapsed = time.perf_counter() - start
+
+    stats = {
+        "mode": mode,
+        "pages": result["pages"],
+        "seconds": round(elapsed, 2),
+        "pages_per_s": round(result["pages"] / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(timer.latencies, 50) * 1000, 1),
+        "p99_ms": round(_percentile(timer.latencies, 99) * 1000, 1),
+        "js_renders": renders() - renders_before,
+        "db_round_trips": db.round_trips - trips_before,
+    }
+    if mode == "COMPARE":
+        counts = dict(db.query("SELECT changed, COUNT(*) FROM observed_pages GROUP BY changed"))
+        stats["changed"] = counts.get(1, 0)
+        stats["unchanged"] = counts.get(0, 0)
+    return stats
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("pages", nargs="?", type=int, default=300)
+    ap.add_argument("--engine", choices=("THREADED", "ASYNC"), default="THREADED")
+    ap.add_argument("--scope", choices=("FULL", "TARGETED"), default="FULL")
+    ap.add_argument("--render", choices=("stub", "browser"), default="stub")
+    ap.add_argument("--deface", type=float, default=0.05, help="share of pages defaced before COMPARE")
+    ap.add_argument("--slow-ms", type=int, default=300)
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    ap.add_argument("--verbose", action="store_true", help="keep the crawler's own output")
+    args = ap.parse_args()
+
+    site = FixtureSite(pages=args.pages, profile=load_profile(PROFILE), slow_ms=args.slow_ms)
+
+    workdir = tempfile.mkdtemp(prefix="bench_crawl_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        db = SQLiteStandIn(Path(workdir) / "bench.sqlite")
+        install(db)
+        data = _use_data_dir(workdir)
+
+        if args.render == "stub":
+            stub = _StubRenderer(site)
+            worker_mod.JS_RENDERER = stub
+            renders = lambda: stub.renders
+        else:
+            renders = lambda: RENDER_STATS["renders"]
+
+        timer = _PageTimer()
+        results = []
+        with site.server() as srv:
+            seed = srv.base_url + "/"
+            results.append(_run_mode("BASELINE", seed, args, db, timer, renders, data))
+            site.deface(args.deface)
+            results.append(_run_mode("COMPARE", seed, args, db, timer, renders, data))
+        COMPARE_POOL.shutdown()
+    finally:
+        os.chdir(cwd)
+
+    if args.json:
+        print(json.dumps({"site_pages": args.pages, "engine": args.engine, "results": results}, indent=2))
+        return
+
+    print(
+        f"\nsite={args.pages} pages  engine={args.engine}  scope={args.scope}  "
+        f"render={args.render}  defaced={len(site.defaced)}  (work dir {workdir})"
+    )
+    print(f"{'mode':<9} {'pages':>6} {'sec':>7} {'pages/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'renders':>8} {'db trips':>9}")
+    for r in results:
+        print(
+            f"{r['mode']:<9} {r['pages']:>6} {r['seconds']:>7.2f} {r['pages_per_s']:>8.1f} "
+            f"{r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['js_renders']:>8} {r['db_round_trips']:>9}"
+        )
+        if "changed" in r:
+            print(f"{'':<9} observed: {r['changed']} changed, {r['unchanged']} unchanged")
+
+
+if __name__ == "__main__":
+    main()
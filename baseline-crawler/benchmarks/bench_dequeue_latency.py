@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: enqueue-to-start latency and idle CPU of crawl workers.
+
+    python -m benchmarks.bench_dequeue_latency [urls] [workers]
+
+fetch() is replaced with a stub that records when each URL was picked
+up, so only the frontier hand-off is measured (no network, no DB).
+"""
+
+import statistics
+import sys
+import time
+
+import crawler.worker as worker_mod
+from crawler.frontier import Frontier
+from crawler.frontier_wait import WaitingFrontier
+from crawler.worker import Worker, shutdown_workers
+
+_started = {}
+
+
+def _stub_fetch(url, parent, depth):
+    _started[url] = time.perf_counter()
+    return {"success": False, "error": "benchmark stub"}
+
+
+def main():
+    n_urls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    n_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    worker_mod.fetch = _stub_fetch
+    frontier = WaitingFrontier(Frontier())
+    workers = [
+        Worker(
+            frontier=frontier,
+            name=f"Bench-{i}",
+            custid=0,
+            siteid_map={0: 0},
+            job_id="bench",
+            crawl_mode="CRAWL",
+            seed_url="http://127.0.0.1/",
+        )
+        for i in range(n_workers)
+    ]
+    for w in workers:
+        w.start()
+
+    # Idle cost: workers with nothing to do
+    time.sleep(0.2)
+    cpu0 = time.process_time()
+    time.sleep(1.0)
+    idle_cpu_ms = (time.process_time() - cpu0) * 1000
+
+    # Trickle URLs in one at a time so every worker is idle when one arrives
+    enqueued = {}
+    for i in range(n_urls):
+        url = f"http://127.0.0.1/page/{i}"
+        enqueued[url] = time.perf_counter()
+        frontier.enqueue(url, None, 0)
+        time.sleep(0.005)
+
+    frontier.queue.join()
+    t0 = time.perf_counter()
+    shutdown_workers(frontier, workers)
+    teardown_ms = (time.perf_counter() - t0) * 1000
+
+    lat = sorted((_started[u] - t) * 1000 for u, t in enqueued.items() if u in _started)
+    print(f"URLs: {len(lat)}  workers: {n_workers}")
+    print(f"enqueue->start  p50={statistics.median(lat):.3f}ms  "
+          f"p99={lat[int(len(lat) * 0.99) - 1]:.3f}ms  max={lat[-1]:.3f}ms")
+    print(f"idle CPU over 1s: {idle_cpu_ms:.2f}ms")
+    print(f"teardown after join(): {teardown_ms:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
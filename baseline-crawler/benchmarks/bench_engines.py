@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Threaded Worker vs AsyncCrawlEngine against a local fixture site.
+
+    python -m benchmarks.bench_engines [fanout] [delay_ms] [threaded_workers]
+
+Runs CRAWL mode (no snapshots, no compare). insert_crawl_page is
+replaced with a no-op so only fetch + parse + frontier work is timed.
+"""
+
+import sys
+import time
+
+import crawler.worker as worker_mod
+from benchmarks.fixture_server import FixtureServer, tree_routes
+from crawler.frontier import Frontier
+from crawler.worker import Worker, shutdown_workers
+from crawler.async_engine import AsyncCrawlEngine
+
+
+def _run_threaded(seed, n_workers):
+    frontier = Frontier()
+    frontier.enqueue(seed, None, 0)
+    workers = [
+        Worker(
+            frontier=frontier,
+            name=f"Bench-{i}",
+            custid=0,
+            siteid_map={0: 0},
+            job_id="bench",
+            crawl_mode="CRAWL",
+            seed_url=seed,
+        )
+        for i in range(n_workers)
+    ]
+    for w in workers:
+        w.start()
+    frontier.queue.join()
+    shutdown_workers(frontier, workers)
+    return frontier.get_stats()["visited_count"]
+
+
+def _run_async(seed):
+    frontier = Frontier()
+    frontier.enqueue(seed, None, 0)
+    AsyncCrawlEngine(
+        frontier=frontier,
+        custid=0,
+        siteid=0,
+        job_id="bench",
+        crawl_mode="CRAWL",
+        seed_url=seed,
+    ).run()
+    return frontier.get_stats()["visited_count"]
+
+
+def main():
+    fanout = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    delay_ms = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    n_workers = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    worker_mod.insert_crawl_page = lambda record: None
+
+    with FixtureServer(tree_routes(fanout=fanout, delay_ms=delay_ms)) as srv:
+        seed = srv.base_url + "/"
+        results = []
+        for label, fn in (
+            (f"threaded x{n_workers}", lambda: _run_threaded(seed, n_workers)),
+            ("async", lambda: _run_async(seed)),
+        ):
+            t0 = time.perf_counter()
+            pages = fn()
+            elapsed = time.perf_counter() - t0
+            results.append((label, pages, elapsed))
+
+    print(f"\nfanout={fanout} delay={delay_ms}ms")
+    for label, pages, elapsed in results:
+        print(f"{label:<14} {pages:5d} pages  {elapsed:7.2f}s  {pages / elapsed:8.1f} pages/s")
+
+
+if __name__ == "__main__":
+    main()
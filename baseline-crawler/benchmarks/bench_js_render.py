@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Benchmark JS render throughput: single render thread vs JSRenderPool.
+
+    python -m benchmarks.bench_js_render [pages] [pool sizes...]
+
+Requires Playwright + Chromium. Pages are local SPA fixtures whose
+content is injected by a script after a short delay.
+"""
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fixture_server import FixtureServer, spa_routes
+from crawler.js_render_worker import JSRenderPool
+
+
+def run(pool_size: int, urls) -> float:
+    pool = JSRenderPool(size=pool_size)
+    try:
+        # Warm up one browser per render thread
+        with ThreadPoolExecutor(max_workers=pool_size) as ex:
+            list(ex.map(pool.render, urls[:pool_size]))
+
+        start = time.perf_counter()
+        # Many crawl workers submitting at once, as in a real crawl
+        with ThreadPoolExecutor(max_workers=20) as ex:
+            list(ex.map(pool.render, urls))
+        return time.perf_counter() - start
+    finally:
+        pool.shutdown()
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    sizes = [int(a) for a in sys.argv[2:]] or [1, 2, 4, 8]
+
+    with FixtureServer(spa_routes(count=pages)) as srv:
+        urls = [f"{srv.base_url}/spa/{n}" for n in range(pages)]
+        print(f"Rendering {pages} SPA pages from {srv.base_url}")
+        for size in sizes:
+            elapsed = run(size, urls)
+            print(f"pool={size:<3} {elapsed:7.2f}s  {pages / elapsed:6.2f} pages/s")
+
+
+if __name__ == "__main__":
+    main()
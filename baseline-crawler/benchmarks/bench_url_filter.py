@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Per-link filtering cost: legacy classify_block + _allowed_domain vs URLFilter.
+
+    python -m benchmarks.bench_url_filter [rounds]
+
+URLs come from combined_domain_analysis.json at the repository root.
+Each round filters the whole set once, as if every URL were extracted
+from one more page (nav links repeat across pages on real sites).
+"""
+
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+from crawler.url_filter import PATH_BLOCK_RULES, STATIC_EXTENSIONS, URLFilter
+
+DATA = Path(__file__).resolve().parents[2] / "combined_domain_analysis.json"
+
+
+# ---------------- legacy (pre-URLFilter) ----------------
+
+def _legacy_classify_block(url):
+    parsed = urlparse(url)
+    if parsed.path.endswith(STATIC_EXTENSIONS):
+        return "STATIC"
+    for k, r in PATH_BLOCK_RULES.items():
+        if re.search(r, parsed.path.lower()):
+            return k
+    return None
+
+
+def _legacy_allowed_domain(seed_url, candidate_url):
+    seed_netloc = urlparse(seed_url).netloc.lower().split(":")[0]
+    cand_netloc = urlparse(candidate_url).netloc.lower().split(":")[0]
+    base = seed_netloc[4:] if seed_netloc.startswith("www.") else seed_netloc
+    return cand_netloc == base or cand_netloc == f"www.{base}"
+
+
+def _legacy(seed, urls):
+    kept = 0
+    for u in urls:
+        if _legacy_classify_block(u):
+            continue
+        if not _legacy_allowed_domain(seed, u):
+            continue
+        kept += 1
+    return kept
+
+
+def _compiled(url_filter, urls):
+    kept = 0
+    for u in urls:
+        reason, _rule = url_filter.check(u)
+        if reason is None:
+            kept += 1
+    return kept
+
+
+def load_urls():
+    data = json.loads(DATA.read_text(encoding="utf-8"))
+    urls = [
+        entry["url"]
+        for bucket in data["distribution"].values()
+        for entry in bucket["urls"]
+    ]
+    return f"https://{data['domain']}/", urls
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    seed, urls = load_urls()
+
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        legacy_kept = _legacy(seed, urls)
+    legacy_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    url_filter = URLFilter(seed, allowed_domains=())
+    for _ in range(rounds):
+        kept = _compiled(url_filter, urls)
+    compiled_s = time.perf_counter() - t0
+
+    # Cold: a fresh filter per round (first page of a job)
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        _compiled(URLFilter(seed, allowed_domains=()), urls)
+    cold_s = time.perf_counter() - t0
+
+    n = len(urls) * rounds
+    assert kept == legacy_kept, (kept, legacy_kept)
+    print(f"{len(urls)} URLs x {rounds} rounds, {kept} kept per round")
+    print(f"legacy          {legacy_s * 1e6 / n:7.2f} us/url")
+    print(f"URLFilter cold  {cold_s * 1e6 / n:7.2f} us/url")
+    print(f"URLFilter warm  {compiled_s * 1e6 / n:7.2f} us/url")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+SQLite stand-in for the crawler's MySQL database, for benchmarks.
+
+install() points every storage entry point the crawl pipeline uses at a
+throwaway SQLite file: get_connection() in the modules that issue their
+own SQL (MySQL placeholders and ON DUPLICATE KEY UPDATE are translated),
+and the crawl-job helpers from crawler.storage.db. Every
+execute()/executemany() counts as one DB round-trip.
+
+Running the benchmark needs the crawler's full runtime: python-dotenv,
+requests (and aiohttp for ASYNC), plus crawler.frontier,
+crawler.fetcher, crawler.parser, crawler.normalizer, crawler.storage.db,
+crawler.storage.mysql, crawler.storage.db_guard and compare_utils.
+"""
+
+import re
+import sqlite3
+import threading
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS crawl_jobs (
+    job_id TEXT PRIMARY KEY, custid INTEGER, siteid INTEGER, start_url TEXT,
+    status TEXT, pages_crawled INTEGER, error TEXT
+);
+CREATE TABLE IF NOT EXISTS crawl_pages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT, custid INTEGER, siteid INTEGER, url TEXT, parent_url TEXT,
+    depth INTEGER, status_code INTEGER, content_type TEXT,
+    content_length INTEGER, response_time_ms INTEGER, fetched_at TEXT
+);
+CREATE TABLE IF NOT EXISTS defacement_sites (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    siteid INTEGER, baseline_id TEXT, url TEXT,
+    -- every baselined page is monitored in the benchmark
+    action TEXT DEFAULT 'selected'
+);
+CREATE TABLE IF NOT EXISTS baseline_pages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    site_id INTEGER, normalized_url TEXT, content_hash TEXT, baseline_path TEXT,
+    UNIQUE (site_id, normalized_url)
+);
+CREATE TABLE IF NOT EXISTS observed_pages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    site_id INTEGER, baseline_id TEXT, normalized_url TEXT, observed_hash TEXT,
+    changed INTEGER, diff_path TEXT, defacement_score REAL, defacement_severity TEXT
+);
+CREATE TABLE IF NOT EXISTS page_validators (
+    site_id INTEGER, url_hash TEXT, normalized_url TEXT, etag TEXT,
+    last_modified TEXT, content_length INTEGER,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (site_id, url_hash)
+);
+"""
+
+_UPSERT = re.compile(r"ON\s+DUPLICATE\s+KEY\s+UPDATE(.*)$", re.IGNORECASE | re.DOTALL)
+_VALUES_REF = re.compile(r"VALUES\((\w+)\)", re.IGNORECASE)
+
+
+def translate(sql: str) -> str:
+    """MySQL dialect used by the crawler -> SQLite."""
+    sql = sql.replace("%s", "?")
+    m = _UPSERT.search(sql)
+    if m:
+        updates = _VALUES_REF.sub(r"excluded.\1", m.group(1))
+        sql = sql[:m.start()] + "ON CONFLICT DO UPDATE SET" + updates
+    return sql
+
+
+class _Cursor:
+    def __init__(self, db, conn, dictionary):
+        self._db = db
+        self._cur = conn.cursor()
+        self._dictionary = dictionary
+
+    def execute(self, sql, params=()):
+        self._db.count()
+        self._cur.execute(translate(sql), params)
+
+    def executemany(self, sql, rows):
+        self._db.count()
+        self._cur.executemany(translate(sql), rows)
+
+    def _as_dict(self, row):
+        cols = [d[0] for d in self._cur.description]
+        return dict(zip(cols, row))
+
+    def fetchone(self):
+        row = self._cur.fetchone()
+        if row is None or not self._dictionary:
+            return row
+        return self._as_dict(row)
+
+    def fetchall(self):
+        rows = self._cur.fetchall()
+        if not self._dictionary:
+            return rows
+        return [self._as_dict(r) for r in rows]
+
+    def close(self):
+        self._cur.close()
+
+
+class _Connection:
+    def __init__(self, db):
+        self._db = db
+        self._conn = sqlite3.connect(db.path, timeout=30, check_same_thread=False)
+
+    def cursor(self, dictionary=False):
+        return _Cursor(self._db, self._conn, dictionary)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+class SQLiteStandIn:
+    def __init__(self, path):
+        self.path = str(path)
+        self.round_trips = 0
+        self._lock = threading.Lock()
+        conn = sqlite3.connect(self.path)
+        conn.executescript(_SCHEMA)
+        conn.close()
+
+    def count(self):
+        with self._lock:
+            self.round_trips += 1
+
+    def get_connection(self):
+        # Callers release DB_SEMAPHORE after closing, like the MySQL pool
+        from crawler.storage.db_guard import DB_SEMAPHORE
+        DB_SEMAPHORE.acquire()
+        return _Connection(self)
+
+    def _run(self, sql, params=()):
+        conn = self.get_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute(sql, params)
+            conn.commit()
+        finally:
+            conn.close()
+            from crawler.storage.db_guard import DB_SEMAPHORE
+            DB_SEMAPHORE.release()
+
+    def query(self, sql, params=()):
+        """Read rows directly (not counted)."""
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    # ---------------- single-row helpers ----------------
+
+    def insert_crawl_job(self, *, job_id, custid, siteid, start_url):
+        self._run(
+            "INSERT INTO crawl_jobs (job_id, custid, siteid, start_url, status) "
+            "VALUES (%s, %s, %s, %s, 'running')",
+            (job_id, custid, siteid, start_url),
+        )
+
+    def complete_crawl_job(self, *, job_id, pages_crawled):
+        self._run(
+            "UPDATE crawl_jobs SET status='completed', pages_crawled=%s WHERE job_id=%s",
+            (pages_crawled, job_id),
+        )
+
+    def fail_crawl_job(self, job_id, error):
+        self._run(
+            "UPDATE crawl_jobs SET status='failed', error=%s WHERE job_id=%s",
+            (error, job_id),
+        )
+
+
+def install(db: SQLiteStandIn):
+    """Route the crawler's storage calls to ``db``."""
+    import main
+    import crawler.defacement_sites as defacement_sites
+    import crawler.storage.baseline_reader as baseline_reader
+    import crawler.storage.page_validators as page_validators
+    import crawler.storage.statements as statements
+    import crawler.storage.write_behind as write_behind
+
+    for module in (defacement_sites, baseline_reader, page_validators, statements, write_behind):
+        module.get_connection = db.get_connection
+
+    main.insert_crawl_job = db.insert_crawl_job
+    main.complete_crawl_job = db.complete_crawl_job
+    main.fail_crawl_job = db.fail_crawl_job
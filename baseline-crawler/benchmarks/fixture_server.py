@@ -0,0 +1,314 @@
+"""
+Local HTTP fixture server for benchmarks.
+Serves generated pages from memory on 127.0.0.1 in a background thread.
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+SPA_PAGE = """<!doctype html>
+<html><head><title>SPA {n}</title></head>
+<body>
+<div id="root"></div>
+<script>
+setTimeout(function () {{
+  var root = document.getElementById("root");
+  var html = "<h1>Page {n}</h1>";
+  for (var i = 0; i < 20; i++) {{
+    html += '<p><a href="/spa/' + (({n} + i) % 50) + '">link ' + i + '</a></p>';
+  }}
+  root.innerHTML = html;
+}}, {delay_ms});
+</script>
+</body></html>
+"""
+
+
+class FixtureServer:
+    """
+    ``routes`` maps a path to a callable returning (status, headers, body)
+    or to a plain string body (served as text/html, 200).
+    """
+
+    def __init__(self, routes=None, fallback=None):
+        self.routes = dict(routes or {})
+        self.fallback = fallback
+        self.httpd = None
+        self.thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                path = self.path.split("#", 1)[0]
+                route = server.routes.get(path)
+                if route is None and server.fallback is not None:
+                    route = lambda: server.fallback(path)
+                if route is None:
+                    status, headers, body = 404, {}, "not found"
+                elif callable(route):
+                    status, headers, body = route()
+                else:
+                    status, headers, body = 200, {}, route
+
+                headers = dict(headers)
+                data = body.encode("utf-8") if isinstance(body, str) else body
+
+                # Conditional GET for routes that send an ETag
+                etag = headers.get("ETag")
+                if status == 200 and etag and self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                self.send_response(status)
+                self.send_header("Content-Type", headers.pop("Content-Type", "text/html; charset=utf-8"))
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+
+def spa_routes(count: int = 50, delay_ms: int = 200) -> dict:
+    return {f"/spa/{n}": SPA_PAGE.format(n=n, delay_ms=delay_ms) for n in range(count)}
+
+
+def _static_page(title: str, links) -> str:
+    # Padded past needs_js_rendering's small-page threshold, no SPA root
+    items = "".join(f'<li><a href="{href}">{href}</a></li>' for href in links)
+    filler = "<p>" + ("Lorem ipsum dolor sit amet. " * 40) + "</p>"
+    return (
+        f"<!doctype html><html><head><title>{title}</title></head><body>"
+        f"<h1>{title}</h1>{filler}<ul>{items}</ul>{filler}</body></html>"
+    )
+
+
+def tree_routes(fanout: int = 30, delay_ms: int = 0) -> dict:
+    """Static site: / -> /s/<i> -> /s/<i>/p/<j>, each optionally delayed."""
+    routes = {}
+
+    def page(body):
+        def _serve():
+            if delay_ms:
+                time.sleep(delay_ms / 1000)
+            return 200, {}, body
+        return _serve
+
+    routes["/"] = page(_static_page("Home", [f"/s/{i}" for i in range(fanout)]))
+    for i in range(fanout):
+        leaves = [f"/s/{i}/p/{j}" for j in range(fanout)]
+        routes[f"/s/{i}"] = page(_static_page(f"Section {i}", leaves + ["/"]))
+        for href in leaves:
+            routes[href] = page(_static_page(href, [f"/s/{i}", "/"]))
+    return routes
+
+
+def _spa_shell(rendered: str) -> str:
+    """Empty #root that a script fills with ``rendered``'s body."""
+    inner = rendered.split("<body>", 1)[-1].rsplit("</body>", 1)[0]
+    payload = json.dumps(inner).replace("</", "<\\/")
+    return (
+        "<!doctype html><html><head><title>SPA</title></head><body>"
+        '<div id="root"></div>'
+        f'<script>document.getElementById("root").innerHTML = {payload};</script>'
+        "</body></html>"
+    )
+
+
+# ==================================================
+# REALISTIC SITE (modelled on a crawled domain)
+# ==================================================
+
+ELEMENTOR_FRAGMENT = (
+    "#elementor-action%3Aaction%3Doff_canvas%3Aopen%26settings%3D"
+    "eyJpZCI6IjQxYmNkYzMiLCJkaXNwbGF5TW9kZSI6Im9wZW4ifQ%3D%3D"
+)
+
+DEFAULT_PROFILE = {
+    "normal_html": 0.79,
+    "pagination": 0.20,
+    "assets_uploads": 0.01,
+    "elementor_fragment": 0.35,
+    "other_fragment": 0.15,
+    "sections": ["blog", "job", "company"],
+}
+
+
+def load_profile(path) -> dict:
+    """
+    URL mix of a crawled domain (combined_domain_analysis.json format):
+    share of each category, of fragment links, and the top sections.
+    Falls back to DEFAULT_PROFILE if the file is missing.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return dict(DEFAULT_PROFILE)
+
+    dist = data["distribution"]
+    total = sum(cat["count"] for cat in dist.values()) or 1
+    urls = [u["url"] for cat in dist.values() for u in cat["urls"]]
+    paths = (urlsplit(u["url"]).path.strip("/") for u in dist.get("normal_html", {}).get("urls", ()))
+    sections = Counter(p.split("/")[0] for p in paths if p)
+
+    profile = {name: cat["count"] / total for name, cat in dist.items()}
+    profile["elementor_fragment"] = sum("#elementor-action" in u for u in urls) / max(len(urls), 1)
+    profile["other_fragment"] = (
+        sum("#" in u and "#elementor-action" not in u for u in urls) / max(len(urls), 1)
+    )
+    profile["sections"] = [s for s, _ in sections.most_common(3)] or DEFAULT_PROFILE["sections"]
+    return profile
+
+
+class FixtureSite:
+    """
+    Generated site for end-to-end crawl benchmarks.
+
+    Every section has a listing page linking all its items; items link to
+    neighbours with Elementor / in-page fragments at the profile's rates,
+    plus pagination and upload URLs. A share of items are SPA shells
+    (``rendered(url)`` gives their post-JS HTML), slow, or erroring.
+    ``deface(fraction)`` swaps some items' content for COMPARE runs.
+    All HTML routes send ETags and answer If-None-Match with 304.
+    """
+
+    def __init__(self, pages=300, profile=None, *, spa_ratio=0.1, slow_ratio=0.05,
+                 slow_ms=300, error_ratio=0.03, links_per_page=12, seed=1):
+        self.profile = profile or dict(DEFAULT_PROFILE)
+        self.rng = random.Random(seed)
+        self.slow_ms = slow_ms
+        self.links_per_page = links_per_page
+        self.defaced = set()
+        self.bodies = {}          # path -> static HTML (post-JS for SPA items)
+        self.kind = {}            # path -> "static" | "spa" | "slow" | "error"
+
+        sections = self.profile["sections"]
+        n_pagination = int(pages * self.profile.get("pagination", 0))
+        n_assets = max(1, int(pages * self.profile.get("assets_uploads", 0)))
+        n_items = max(1, pages - n_pagination - n_assets - len(sections) - 1)
+
+        self.items = [f"/{sections[i % len(sections)]}/item-{i}" for i in range(n_items)]
+        self.pagination = [
+            f"/{sections[i % len(sections)]}/page/{i // len(sections) + 2}" for i in range(n_pagination)
+        ]
+        self.assets = [f"/wp-content/uploads/2024/{i % 12 + 1:02d}/image-{i}.jpg" for i in range(n_assets)]
+
+        for path in self.items:
+            r = self.rng.random()
+            if r < spa_ratio:
+                self.kind[path] = "spa"
+            elif r < spa_ratio + slow_ratio:
+                self.kind[path] = "slow"
+            elif r < spa_ratio + slow_ratio + error_ratio:
+                self.kind[path] = "error"
+            else:
+                self.kind[path] = "static"
+
+        for section in sections:
+            listing = f"/{section}/"
+            members = [p for p in self.items if p.startswith(listing)]
+            self.bodies[listing] = _static_page(section.title(), self._decorate(members + ["/"]))
+        self.bodies["/"] = _static_page("Home", self._decorate([f"/{s}/" for s in sections]))
+        for path in self.items + self.pagination:
+            self.bodies[path] = _static_page(path, self._decorate(self._neighbours(path)))
+
+    def _neighbours(self, path):
+        links = self.rng.sample(self.items, min(self.links_per_page, len(self.items)))
+        links += self.rng.sample(self.pagination, min(2, len(self.pagination)))
+        links += self.rng.sample(self.assets, min(1, len(self.assets)))
+        return links + ["/", "/" + path.strip("/").split("/")[0] + "/"]
+
+    def _decorate(self, links):
+        out = []
+        for href in links:
+            r = self.rng.random()
+            if r < self.profile["elementor_fragment"]:
+                href += ELEMENTOR_FRAGMENT
+            elif r < self.profile["elementor_fragment"] + self.profile["other_fragment"]:
+                href += "#page"
+            out.append(href)
+        return out
+
+    # ---------------- CONTENT ----------------
+
+    def deface(self, fraction, seed=2):
+        """Mark ``fraction`` of the items as defaced (served replaced)."""
+        rng = random.Random(seed)
+        candidates = [p for p in self.items if self.kind[p] != "error"]
+        self.defaced = set(rng.sample(candidates, int(len(candidates) * fraction)))
+
+    def _html(self, path):
+        if path in self.defaced:
+            return (
+                "<!doctype html><html><body><h1>Hacked by bench</h1>"
+                + "<p>" + "owned " * 600 + "</p><a href=\"/\">home</a> <a href=\"/\">x</a></body></html>"
+            )
+        return self.bodies[path]
+
+    def rendered(self, url):
+        """Post-JS HTML of a page (what Playwright would return)."""
+        # http://host (no trailing slash) is the home page
+        return self._html(urlsplit(url).path or "/")
+
+    def _serve(self, path):
+        if path in self.assets:
+            return 200, {"Content-Type": "image/jpeg"}, b"\xff\xd8" + b"\0" * 2048
+
+        if path not in self.bodies:
+            return 404, {}, "not found"
+
+        kind = self.kind.get(path, "static")
+        if kind == "error":
+            return (500 if len(path) % 2 else 404), {}, "error"
+        if kind == "slow":
+            time.sleep(self.slow_ms / 1000)
+
+        if kind == "spa" and path not in self.defaced:
+            body = _spa_shell(self.bodies[path])
+        else:
+            body = self._html(path)
+        etag = '"' + hashlib.md5(body.encode("utf-8")).hexdigest() + '"'
+        return 200, {"ETag": etag}, body
+
+    def server(self) -> FixtureServer:
+        return FixtureServer(fallback=self._serve)
@@ -0,0 +1,287 @@
+"""
+Opt-in asyncio crawl engine (CRAWL_ENGINE=ASYNC).
+
+Fetches run on one event loop with a pooled aiohttp session, so hundreds
+of requests can be in flight without a thread each. Everything after the
+fetch goes through the same PageHandler as the threaded Worker, on a
+bounded thread pool, so BASELINE / CRAWL / COMPARE behave identically.
+"""
+
+import asyncio
+import functools
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+try:
+    import aiohttp
+except ImportError:  # optional dependency
+    aiohttp = None
+
+from requests.compat import chardet
+from requests.utils import get_encoding_from_headers
+
+from crawler.config import (
+    ALLOWED_DOMAINS,
+    USER_AGENT,
+    REQUEST_TIMEOUT,
+    ASYNC_MAX_CONCURRENCY,
+    ASYNC_HANDLER_THREADS,
+    PER_HOST_MAX_INFLIGHT,
+)
+from crawler.revalidate import conditional_headers
+from crawler.scheduler import host_key, async_host_slot
+from crawler.worker import PageHandler
+
+DEQUEUE_TIMEOUT = 0.2
+
+
+class _Response:
+    """
+    The subset of requests.Response that PageHandler relies on.
+
+    Decodes exactly like requests (header charset, ISO-8859-1 for text/*
+    without one, else detected), so both engines hash the same text.
+    """
+
+    def __init__(self, *, url, status_code, headers, content):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = get_encoding_from_headers(headers)
+
+    @property
+    def apparent_encoding(self):
+        if chardet is not None:
+            return chardet.detect(self.content)["encoding"]
+        return "utf-8"
+
+    @property
+    def text(self) -> str:
+        if not self.content:
+            return ""
+        encoding = self.encoding
+        if encoding is None:
+            encoding = self.apparent_encoding
+        try:
+            return str(self.content, encoding, errors="replace")
+        except (LookupError, TypeError):
+            return str(self.content, errors="replace")
+
+
+class AsyncCrawlEngine:
+    def __init__(
+        self,
+        *,
+        frontier,
+        custid,
+        siteid,
+        job_id,
+        crawl_mode,
+        seed_url,
+        concurrency=ASYNC_MAX_CONCURRENCY,
+        load_stats=None,
+        writer=None,
+        url_filter=None,
+        canonicalizer=None,
+        block_report=None,
+        discover=True,
+        render_advisor=None,
+    ):
+        if aiohttp is None:
+            raise RuntimeError("CRAWL_ENGINE=ASYNC requires the aiohttp package")
+
+        self.frontier = frontier
+        # Per-host fetches are capped by the shared PER_HOST_MAX_INFLIGHT
+        # slots; a job only crawls its site's host (plus ALLOWED_DOMAINS),
+        # so anything above that per host would just wait for a slot
+        hosts = 1 + len(ALLOWED_DOMAINS)
+        self.concurrency = min(concurrency, PER_HOST_MAX_INFLIGHT * hosts)
+        self.load_stats = load_stats
+        self.name = f"Async-{siteid}"
+        self.handler = PageHandler(
+            frontier=frontier,
+            name=self.name,
+            custid=custid,
+            siteid=siteid,
+            job_id=job_id,
+            crawl_mode=crawl_mode,
+            seed_url=seed_url,
+            writer=writer,
+            url_filter=url_filter,
+            canonicalizer=canonicalizer,
+            block_report=block_report,
+            discover=discover,
+            render_advisor=render_advisor,
+        )
+
+    def run(self):
+        """Crawl until the frontier is drained (same as queue.join())."""
+        asyncio.run(self._main())
+
+    # ==================================================
+    # EVENT LOOP
+    # ==================================================
+
+    async def _main(self):
+        loop = asyncio.get_running_loop()
+
+        # queue.join() blocks, so wait for it on a daemon thread and
+        # signal the loop; never park it in the loop's default executor
+        drained = asyncio.Event()
+
+        def _wait_drained():
+            self.frontier.queue.join()
+            loop.call_soon_threadsafe(drained.set)
+
+        threading.Thread(target=_wait_drained, name=f"{self.name}-join", daemon=True).start()
+
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._host_gates = {}
+        # Waits for per-host slots held by other jobs' threaded workers
+        self._slot_waiters = ThreadPoolExecutor(
+            max_workers=PER_HOST_MAX_INFLIGHT,
+            thread_name_prefix=f"{self.name}-hostslot",
+        )
+        self._handlers = ThreadPoolExecutor(
+            max_workers=ASYNC_HANDLER_THREADS,
+            thread_name_prefix=f"{self.name}-handler",
+        )
+        getter = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{self.name}-dequeue")
+
+        # No connector per-host limit: the host slots are the only one
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=0,
+            ttl_dns_cache=300,
+        )
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        tasks = set()
+
+        print(
+            f"[{self.name}] started ({self.handler.crawl_mode}, {self.concurrency} concurrent, "
+            f"at most {PER_HOST_MAX_INFLIGHT} per host)"
+        )
+
+        try:
+            async with aiohttp.ClientSession(
+                connector=connector,
+                timeout=timeout,
+                headers={"User-Agent": USER_AGENT},
+            ) as session:
+                self._session = session
+
+                while not drained.is_set():
+                    await self._slots.acquire()
+                    item = await loop.run_in_executor(getter, self._next_item)
+                    if item is None:
+                        self._slots.release()
+                        continue
+
+                    task = asyncio.create_task(self._process(item))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+
+                if tasks:
+                    await asyncio.gather(*tasks)
+        finally:
+            getter.shutdown(wait=True)
+            self._handlers.shutdown(wait=True)
+            self._slot_waiters.shutdown(wait=True)
+
+    def _next_item(self):
+        item, got_task = self.frontier.dequeue(timeout=DEQUEUE_TIMEOUT)
+        return item if got_task else None
+
+    def _host_gate(self, url):
+        # The engine's side of the shared per-host slots (same key, same
+        # PER_HOST_MAX_INFLIGHT): at most that many coroutines per host
+        # contend for a slot, bounding the threads parked waiting on it
+        host = host_key(url)
+        sem = self._host_gates.get(host)
+        if sem is None:
+            sem = self._host_gates[host] = asyncio.Semaphore(PER_HOST_MAX_INFLIGHT)
+        return sem
+
+    # ==================================================
+    # PER PAGE
+    # ==================================================
+
+    async def _fetch(self, url, validators):
+        """Same result shape as crawler.fetcher.fetch() / conditional_fetch()."""
+        headers = conditional_headers(validators) if validators else {}
+
+        try:
+            async with self._session.get(url, headers=headers, allow_redirects=True) as r:
+                content = await r.read()
+                resp = _Response(
+                    url=str(r.url),
+                    status_code=r.status,
+                    headers=r.headers,
+                    content=content,
+                )
+        except Exception as e:
+            return {"success": False, "error": str(e), "not_modified": False}
+
+        if resp.status_code == 304:
+            return {"success": True, "response": resp, "not_modified": True}
+        if resp.status_code >= 400:
+            return {
+                "success": False,
+                "error": f"HTTP {resp.status_code}",
+                "response": resp,
+                "not_modified": False,
+            }
+        return {"success": True, "response": resp, "not_modified": False}
+
+    async def _process(self, item):
+        loop = asyncio.get_running_loop()
+        url, parent, depth = item
+        start = time.time()
+        if self.load_stats:
+            self.load_stats.task_started()
+
+        try:
+            print(f"[{self.name}] Crawling {url}")
+            validators = self.handler.validators_for(url)
+
+            metrics = self.handler.metrics
+            wait_start = time.perf_counter()
+            async with self._host_gate(url), async_host_slot(url, self._slot_waiters):
+                fetch_start = time.perf_counter()
+                metrics.observe("host_slot_wait", fetch_start - wait_start)
+                result = await self._fetch(url, validators)
+                metrics.observe("fetch", time.perf_counter() - fetch_start)
+            fetched_at = datetime.now(timezone.utc)
+            if self.load_stats:
+                self.load_stats.record_fetch(
+                    int((time.time() - start) * 1000),
+                    ok=result["success"],
+                )
+
+            # Render hand-off, hashing and DB writes block: keep them off the loop
+            await loop.run_in_executor(
+                self._handlers,
+                functools.partial(
+                    self.handler.handle,
+                    url=url,
+                    parent=parent,
+                    depth=depth,
+                    result=result,
+                    start=start,
+                    fetched_at=fetched_at,
+                ),
+            )
+
+        except Exception as e:
+            print(f"[{self.name}] ERROR {url}: {e}")
+            print(f"[{self.name}] Traceback: {traceback.format_exc()}")
+
+        finally:
+            if self.load_stats:
+                self.load_stats.task_finished()
+            self.frontier.mark_visited(url, got_task=True)
+            self._slots.release()
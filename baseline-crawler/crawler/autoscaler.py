@@ -0,0 +1,154 @@
+"""
+Per-site worker autoscaling.
+
+Grows the worker pool while the frontier backlog is deep and the site is
+responding well; shrinks it when workers sit idle or the site starts
+erroring/slowing down. Decisions need several consecutive agreeing
+samples (hysteresis) and are capped by MAX_WORKERS and the shared
+WorkerBudget.
+"""
+
+import threading
+
+from crawler.config import (
+    MIN_WORKERS,
+    MAX_WORKERS,
+    SCALE_THRESHOLD,
+    SCALE_INTERVAL,
+    SCALE_STEP,
+    SCALE_UP_CHECKS,
+    SCALE_DOWN_CHECKS,
+    SCALE_MAX_LATENCY_MS,
+    SCALE_MAX_ERROR_RATE,
+)
+
+
+class SiteLoadStats:
+    """Counters shared by a site's workers; read by the Autoscaler."""
+
+    EWMA_ALPHA = 0.2
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.inflight = 0
+        self.latency_ms = None
+        self.fetches = 0
+        self.errors = 0
+
+    def task_started(self):
+        with self._lock:
+            self.inflight += 1
+
+    def task_finished(self):
+        with self._lock:
+            self.inflight -= 1
+
+    def record_fetch(self, elapsed_ms: int, ok: bool):
+        with self._lock:
+            self.fetches += 1
+            if not ok:
+                self.errors += 1
+            if self.latency_ms is None:
+                self.latency_ms = float(elapsed_ms)
+            else:
+                self.latency_ms += self.EWMA_ALPHA * (elapsed_ms - self.latency_ms)
+
+    def sample(self):
+        """(inflight, latency_ms, fetches, errors) since the last sample."""
+        with self._lock:
+            snap = (self.inflight, self.latency_ms, self.fetches, self.errors)
+            self.fetches = 0
+            self.errors = 0
+        return snap
+
+
+class Autoscaler(threading.Thread):
+    def __init__(self, *, frontier, budget, stats, spawn, workers, name="Autoscaler"):
+        super().__init__(name=name, daemon=True)
+        self.frontier = frontier
+        self.budget = budget
+        self.stats = stats
+        self.spawn = spawn          # callable(index) -> started Worker
+        self.workers = workers      # live list, owned by this thread while running
+        self._stop_event = threading.Event()
+        self._up_votes = 0
+        self._down_votes = 0
+        self._spawned = len(workers)
+        self.peak_workers = len(workers)
+        self.retired = []
+
+    def _decide(self, backlog, inflight, latency_ms, fetches, errors) -> int:
+        n = len(self.workers)
+        error_rate = errors / fetches if fetches else 0.0
+        slow = latency_ms is not None and latency_ms > SCALE_MAX_LATENCY_MS
+
+        if error_rate > SCALE_MAX_ERROR_RATE or slow:
+            # Site is struggling: back off regardless of backlog
+            self._up_votes = 0
+            self._down_votes += 1
+        elif backlog > SCALE_THRESHOLD:
+            self._up_votes += 1
+            self._down_votes = 0
+        elif backlog == 0 and inflight < n:
+            self._down_votes += 1
+            self._up_votes = 0
+        else:
+            self._up_votes = 0
+            self._down_votes = 0
+
+        if self._up_votes >= SCALE_UP_CHECKS and n < MAX_WORKERS:
+            self._up_votes = 0
+            return min(SCALE_STEP, MAX_WORKERS - n)
+        if self._down_votes >= SCALE_DOWN_CHECKS and n > MIN_WORKERS:
+            self._down_votes = 0
+            return -min(SCALE_STEP, n - MIN_WORKERS)
+        return 0
+
+    def _scale_up(self, count):
+        granted = self.budget.try_acquire(count)
+        added = 0
+        try:
+            for _ in range(granted):
+                self.workers.append(self.spawn(self._spawned))
+                self._spawned += 1
+                added += 1
+        except Exception as e:
+            print(f"[{self.name}] Failed to start a worker: {e}")
+        finally:
+            # Slots for workers that never started go back to the budget
+            if added < granted:
+                self.budget.release(granted - added)
+        self.peak_workers = max(self.peak_workers, len(self.workers))
+        return added
+
+    def _scale_down(self, count):
+        for _ in range(count):
+            w = self.workers.pop()
+            w.stop()
+            self.retired.append(w)
+        self.budget.release(count)
+        return count
+
+    def run(self):
+        while not self._stop_event.wait(SCALE_INTERVAL):
+            backlog = self.frontier.queue.qsize()
+            inflight, latency_ms, fetches, errors = self.stats.sample()
+            delta = self._decide(backlog, inflight, latency_ms, fetches, errors)
+
+            if delta > 0:
+                added = self._scale_up(delta)
+                if added:
+                    print(
+                        f"[{self.name}] +{added} worker(s) -> {len(self.workers)} "
+                        f"(backlog={backlog}, latency={latency_ms or 0:.0f}ms)"
+                    )
+            elif delta < 0:
+                removed = self._scale_down(-delta)
+                print(
+                    f"[{self.name}] -{removed} worker(s) -> {len(self.workers)} "
+                    f"(backlog={backlog}, inflight={inflight}, errors={errors}/{fetches})"
+                )
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
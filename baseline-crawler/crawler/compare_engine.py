@@ -1,74 +1,190 @@
 # crawler/compare_engine.py
 
+import functools
+import time
 from pathlib import Path
 
-from crawler.normalizer import normalize_url, normalize_html
-from crawler.hasher import sha256
-from crawler.storage.baseline_reader import get_baseline_hash
-from crawler.storage.mysql import insert_observed_page
-from crawler.defacement_sites import get_selected_defacement_rows
-
-from compare_utils import (
-    generate_html_diff,
-    calculate_defacement_percentage,
-    defacement_severity,
+from crawler.normalizer import normalize_url
+from crawler.page_digest import page_content_hash
+from crawler.storage.baseline_reader import load_baseline_snapshot
+from crawler.storage.statements import insert_observed_page
+from crawler.storage.snapshot_store import (
+    read_snapshot,
+    read_fingerprint,
+)
+from crawler.defacement_sites import DefacementIndex
+from crawler.fingerprint import page_fingerprint, fingerprint_similarity
+from crawler.compare_pool import ComparePool, score_and_diff
+from crawler.metrics import metrics_for
+from crawler.config import (
+    DEFACEMENT_REFRESH_SECONDS,
+    FINGERPRINT_SKIP_THRESHOLD,
+    FINGERPRINT_SKIP_SEVERITY,
 )
 
 BASELINE_ROOT = Path("baselines")
 DIFF_ROOT = Path("diffs")
 
 
+# Shared by every worker's engine: rows are loaded and canonicalized once
+DEFACEMENT_INDEX = DefacementIndex()
+
+# Shared by every job: scoring/diffing runs in worker processes
+COMPARE_POOL = ComparePool()
+
+
 def _canon(url: str) -> str:
     return normalize_url(url)
 
 
 class CompareEngine:
-    def __init__(self, *, custid: int):
+    def __init__(self, *, custid: int, index: DefacementIndex = None, writer=None,
+                 job_id=None, pool: ComparePool = None):
         self.custid = custid
-        self._rows = None
+        self.index = index if index is not None else DEFACEMENT_INDEX
+        self.writer = writer
+        self.job_id = job_id
+        self.pool = pool if pool is not None else COMPARE_POOL
+        self.metrics = metrics_for(job_id) if job_id is not None else None
 
-    def _load_rows(self):
-        if self._rows is None:
-            self._rows = get_selected_defacement_rows() or []
-            print(f"[COMPARE] Loaded {len(self._rows)} defacement row(s)")
-        return self._rows
+    def _count(self, event):
+        if self.metrics is not None:
+            self.metrics.incr(event)
 
-    def handle_page(self, *, siteid: int, url: str, html: str):
-        rows = self._load_rows()
-        if not rows:
-            print(f"[COMPARE] No defacement rows to compare. Skipping {url}")
+    def _record_observed(self, **fields):
+        # Queue on the job's write-behind writer when there is one
+        if self.writer is not None:
+            self.writer.observed_page(**fields)
+        else:
+            insert_observed_page(**fields)
+
+    def _record_change(self, result, *, siteid, baseline_id, url, canon_url, observed_hash):
+        """Record a scored change (called inline or from the compare pool)."""
+        if "error" in result:
+            self._count("compare_errors")
+            print(f"[COMPARE]   [ERROR] {result['error']}")
             return
 
+        self._count("pages_changed")
+        if self.metrics is not None:
+            self.metrics.observe("score_diff", result["elapsed"])
+
+        score = result["score"]
+        severity = result["severity"]
+        print(f"[COMPARE]   Defacement: {score}% | Severity: {severity}")
+
+        try:
+            self._record_observed(
+                site_id=siteid,
+                baseline_id=baseline_id,
+                normalized_url=canon_url,
+                observed_hash=observed_hash,
+                changed=True,
+                diff_path=result["diff_path"],
+                defacement_score=score,
+                defacement_severity=severity,
+            )
+        except Exception as e:
+            print(f"[COMPARE]   [ERROR] Failed to insert change: {e}")
+
+        print(
+            f"[COMPARE] *** DEFACEMENT: {url} | "
+            f"Defacement={score}% | Severity={severity}"
+        )
+
+    def refresh_rows(self):
+        """Force a reload of defacement_sites (e.g. after rows were re-selected)."""
+        return self.index.refresh()
+
+    def handle_not_modified(self, *, siteid: int, url: str):
+        """
+        Record a 304 revalidation as UNCHANGED for every matching row.
+
+        Returns the baseline HTML (for link discovery), or None.
+        """
+        self.index.ensure_loaded(max_age=DEFACEMENT_REFRESH_SECONDS)
         canon_url = _canon(url)
+        snapshot = load_baseline_snapshot(siteid)
+        baseline = (
+            snapshot.get(canon_url)
+            or snapshot.get(canon_url.rstrip("/") + "/")
+            or snapshot.get(canon_url.rstrip("/"))
+        )
+
+        baseline_html = None
+        for row in self.index.lookup(canon_url):
+            baseline_id = row["baseline_id"]
+            print(f"[COMPARE]   [OK] UNCHANGED (304 Not Modified) baseline_id={baseline_id}")
+            if baseline:
+                try:
+                    self._record_observed(
+                        site_id=siteid,
+                        baseline_id=baseline_id,
+                        normalized_url=canon_url,
+                        observed_hash=baseline["content_hash"],
+                        changed=False,
+                        diff_path=None,
+                        defacement_score=0.0,
+                        defacement_severity="NONE",
+                    )
+                except Exception as e:
+                    print(f"[COMPARE]   [ERROR] Failed to insert unchanged: {e}")
+            if baseline_html is None:
+                baseline_html = read_snapshot(
+                    site_dir=BASELINE_ROOT / str(self.custid) / str(siteid),
+                    baseline_id=baseline_id,
+                )
+
+        return baseline_html
+
+    def monitored_url(self, url: str):
+        """
+        Canonical URL if ``url`` has a selected defacement row (i.e. will
+        be compared), else None. Pass it on to handle_page(canon_url=...).
+        """
+        self.index.ensure_loaded(max_age=DEFACEMENT_REFRESH_SECONDS)
+        canon_url = _canon(url)
+        return canon_url if self.index.lookup(canon_url) else None
+
+    def handle_page(self, *, siteid: int, url: str, html: str, observed_hash: str = None,
+                    canon_url: str = None):
+        self.index.ensure_loaded(max_age=DEFACEMENT_REFRESH_SECONDS)
+        if not self.index:
+            print(f"[COMPARE] No defacement rows to compare. Skipping {url}")
+            return
+
+        if canon_url is None:
+            canon_url = _canon(url)
+        # Index is keyed slash-insensitively: covers exact + both slash variants
+        rows = self.index.lookup(canon_url)
+        if not rows:
+            # Unmonitored: nothing to compare, so never hashed
+            print(f"[COMPARE]   [SKIP] No matching defacement row found for {url}")
+            return
+
         canon_url_slash = canon_url if canon_url.endswith("/") else canon_url + "/"
         canon_url_noslash = canon_url.rstrip("/")
-        
-        observed_hash = sha256(normalize_html(html))
+
+        if observed_hash is None:
+            observed_hash = page_content_hash(html)
 
         print(f"[COMPARE] Checking {url}")
         print(f"[COMPARE]   Canonical: {canon_url}")
         print(f"[COMPARE]   Also checking: {canon_url_slash} and {canon_url_noslash}")
         print(f"[COMPARE]   Observed hash: {observed_hash}")
 
-        matched = False
-        for row in rows:
-            row_canon = _canon(row["url"])
-            row_slash = row_canon if row_canon.endswith("/") else row_canon + "/"
-            row_noslash = row_canon.rstrip("/")
-            
-            # Check all variations: exact match or with/without trailing slash
-            if canon_url != row_canon and canon_url_slash != row_slash and canon_url_noslash != row_noslash:
-                continue
+        observed_fp = None
 
-            matched = True
+        for row in rows:
             baseline_id = row["baseline_id"]
             print(f"[COMPARE]   [MATCH] URL matched! baseline_id={baseline_id}")
 
-            # Try both versions of the URL for baseline lookup
+            # Try both versions of the URL for baseline lookup (in-memory, no DB)
+            snapshot = load_baseline_snapshot(siteid)
             baseline = (
-                get_baseline_hash(site_id=siteid, normalized_url=canon_url)
-                or get_baseline_hash(site_id=siteid, normalized_url=canon_url_slash)
-                or get_baseline_hash(site_id=siteid, normalized_url=canon_url_noslash)
+                snapshot.get(canon_url)
+                or snapshot.get(canon_url_slash)
+                or snapshot.get(canon_url_noslash)
             )
 
             if not baseline:
@@ -79,9 +195,10 @@ class CompareEngine:
 
             # ================= UNCHANGED =================
             if observed_hash == baseline["content_hash"]:
+                self._count("pages_unchanged")
                 print(f"[COMPARE]   [OK] UNCHANGED (hashes match)")
                 try:
-                    insert_observed_page(
+                    self._record_observed(
                         site_id=siteid,
                         baseline_id=baseline_id,
                         normalized_url=canon_url,
@@ -97,62 +214,61 @@ class CompareEngine:
 
             # ================= CHANGED =================
             print(f"[COMPARE]   [WARNING] CHANGE DETECTED (hashes differ)")
-            baseline_file = (
-                BASELINE_ROOT
-                / str(self.custid)
-                / str(siteid)
-                / f"{baseline_id}.html"
-            )
-
-            print(f"[COMPARE]   Looking for baseline file: {baseline_file}")
-            if not baseline_file.exists():
-                print(f"[COMPARE]   [ERROR] Baseline file not found: {baseline_file}")
-                continue
-
-            print(f"[COMPARE]   [OK] Baseline file found")
-            old_html = baseline_file.read_text(
-                encoding="utf-8",
-                errors="ignore",
-            )
-
-            # 🔑 Calculate defacement percentage
-            score = calculate_defacement_percentage(old_html, html)
-            severity = defacement_severity(score)
-
-            print(f"[COMPARE]   Defacement: {score}% | Severity: {severity}")
+            site_dir = BASELINE_ROOT / str(self.custid) / str(siteid)
 
-            # 🔒 ONE diff file per baseline page
-            diff_dir = DIFF_ROOT / str(self.custid) / str(siteid)
-            diff_dir.mkdir(parents=True, exist_ok=True)
+            # ---------------- FAST PATH (fingerprint) ----------------
+            baseline_fp = None
+            fast = {}
+            if FINGERPRINT_SKIP_THRESHOLD is not None:
+                baseline_fp = read_fingerprint(
+                    site_dir=site_dir,
+                    content_hash=baseline["content_hash"],
+                )
+                if baseline_fp is not None:
+                    if observed_fp is None:
+                        started = time.perf_counter()
+                        observed_fp = page_fingerprint(html)
+                        if self.metrics is not None:
+                            self.metrics.observe("fingerprint", time.perf_counter() - started)
+                    similarity = fingerprint_similarity(baseline_fp, observed_fp)
+                    print(f"[COMPARE]   Fingerprint similarity: {similarity:.3f}")
 
-            file_prefix = str(baseline_id)
+                    if similarity >= FINGERPRINT_SKIP_THRESHOLD:
+                        # Still a change, recorded without full scoring
+                        self._count("pages_near_identical")
+                        print(f"[COMPARE]   Near-identical structure, skipping full scoring")
+                        fast = dict(
+                            score=round((1 - similarity) * 100, 2),
+                            severity=FINGERPRINT_SKIP_SEVERITY,
+                        )
 
-            generate_html_diff(
+            task = dict(
+                site_dir=str(site_dir),
+                baseline_id=baseline_id,
+                baseline_hash=baseline["content_hash"],
+                backfill_fingerprint=FINGERPRINT_SKIP_THRESHOLD is not None and baseline_fp is None,
                 url=url,
-                html_a=old_html,
-                html_b=html,
-                out_dir=diff_dir,
-                file_prefix=file_prefix,
+                html=html,
+                diff_dir=str(DIFF_ROOT / str(self.custid) / str(siteid)),
+                file_prefix=str(baseline_id),
+                **fast,
             )
-
-            try:
-                insert_observed_page(
-                    site_id=siteid,
-                    baseline_id=baseline_id,
-                    normalized_url=canon_url,
-                    observed_hash=observed_hash,
-                    changed=True,
-                    diff_path=str(diff_dir / f"{file_prefix}.html"),
-                    defacement_score=score,
-                    defacement_severity=severity,
-                )
-            except Exception as e:
-                print(f"[COMPARE]   [ERROR] Failed to insert change: {e}")
-
-            print(
-                f"[COMPARE] *** DEFACEMENT: {url} | "
-                f"Defacement={score}% | Severity={severity}"
+            on_done = functools.partial(
+                self._record_change,
+                siteid=siteid,
+                baseline_id=baseline_id,
+                url=url,
+                canon_url=canon_url,
+                observed_hash=observed_hash,
             )
 
-        if not matched:
-            print(f"[COMPARE]   [SKIP] No matching defacement row found for {url}")
+            if self.pool is not None and self.pool.enabled:
+                # Scoring + diffing hold the GIL: hand off and keep crawling
+                print(f"[COMPARE]   Queued for scoring/diff: baseline_id={baseline_id}")
+                started = time.perf_counter()
+                self.pool.submit(self.job_id, on_done, **task)
+                if self.metrics is not None:
+                    # Non-zero only when the pool's submission queue is full
+                    self.metrics.observe("compare_pool_wait", time.perf_counter() - started)
+            else:
+                on_done(score_and_diff(**task))
@@ -0,0 +1,210 @@
+"""
+Process pool for the CPU-heavy part of COMPARE.
+
+calculate_defacement_percentage() and generate_html_diff() are pure
+Python over two full documents; on a crawl thread they hold the GIL and
+stall every other worker's I/O. Crawl threads hand off (baseline_id,
+observed html) and go back to fetching; a worker process reads the
+baseline snapshot, scores and writes the diff, and the result callback
+records the observed_pages row.
+
+If a worker process dies (OOM kill, crash in the diff) the executor is
+broken for good: it is replaced, and the pages it lost are scored
+inline on the result thread so they still get their observed_pages row.
+
+Submission is bounded (COMPARE_POOL_QUEUE_SIZE pages in flight across
+all jobs), so a defacement wave slows crawl threads down instead of
+piling up HTML in memory. drain(job_id) waits for one job's pages;
+barrier(job_id) waits only for those submitted before the call.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from crawler.config import (
+    COMPARE_POOL_WORKERS,
+    COMPARE_POOL_QUEUE_SIZE,
+    COMPARE_DIFF_MIN_SCORE,
+)
+from crawler.storage.snapshot_store import read_snapshot, write_fingerprint
+from crawler.fingerprint import page_fingerprint
+
+from compare_utils import (
+    generate_html_diff,
+    calculate_defacement_percentage,
+    defacement_severity,
+)
+
+
+def score_and_diff(*, site_dir, baseline_id, baseline_hash, backfill_fingerprint,
+                   url, html, diff_dir, file_prefix, score=None, severity=None):
+    """
+    Score ``html`` against baseline ``baseline_id`` and write its diff
+    (skipped, with diff_path None, below COMPARE_DIFF_MIN_SCORE).
+
+    A ``score``/``severity`` given by the caller (fingerprint fast path)
+    is kept instead of scoring.
+
+    Runs in a worker process (or inline). Returns a dict with "score",
+    "severity", "diff_path" and "elapsed" (seconds), or "error".
+    """
+    started = time.perf_counter()
+    site_dir = Path(site_dir)
+    old_html = read_snapshot(site_dir=site_dir, baseline_id=baseline_id)
+    if old_html is None:
+        return {"error": f"Baseline snapshot not found: {site_dir}/{baseline_id}"}
+
+    # Backfill fingerprints for baselines stored before they existed
+    if backfill_fingerprint:
+        write_fingerprint(
+            site_dir=site_dir,
+            content_hash=baseline_hash,
+            fingerprint=page_fingerprint(old_html),
+        )
+
+    # 🔑 Calculate defacement percentage
+    if score is None:
+        score = calculate_defacement_percentage(old_html, html)
+        severity = defacement_severity(score)
+
+    # 🔒 ONE diff file per baseline page, only for changes worth reviewing
+    diff_path = None
+    if score >= COMPARE_DIFF_MIN_SCORE:
+        diff_dir = Path(diff_dir)
+        diff_dir.mkdir(parents=True, exist_ok=True)
+        generate_html_diff(
+            url=url,
+            html_a=old_html,
+            html_b=html,
+            out_dir=diff_dir,
+            file_prefix=file_prefix,
+        )
+        diff_path = str(diff_dir / f"{file_prefix}.html")
+
+    return {
+        "score": score,
+        "severity": severity,
+        "diff_path": diff_path,
+        "elapsed": time.perf_counter() - started,
+    }
+
+
+def _score_inline(task):
+    try:
+        return score_and_diff(**task)
+    except Exception as e:
+        return {"error": f"inline compare failed: {e}"}
+
+
+class ComparePool:
+    def __init__(self, workers=COMPARE_POOL_WORKERS, queue_size=COMPARE_POOL_QUEUE_SIZE):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._executor = None
+        self._start_lock = threading.Lock()
+        self._seq = 0
+        self._pending = {}            # job_id -> {submission seq} in flight
+        self._cond = threading.Condition()
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def _ensure_executor(self):
+        if self._executor is None:
+            with self._start_lock:
+                if self._executor is None:
+                    # spawn, not fork: the parent has crawl and browser threads
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return self._executor
+
+    def _discard_executor(self, broken):
+        """Drop ``broken`` so the next submit() starts a fresh executor."""
+        with self._start_lock:
+            if self._executor is broken:
+                self._executor = None
+            else:
+                broken = None
+        if broken is not None:
+            print("[COMPARE]   [WARNING] Compare worker process died; restarting the pool")
+            broken.shutdown(wait=False)
+
+    def submit(self, job_id, on_done, **task):
+        """
+        Queue score_and_diff(**task); ``on_done(result)`` runs when it
+        finishes. Blocks while COMPARE_POOL_QUEUE_SIZE pages are in flight.
+        """
+        executor = self._ensure_executor()
+        self._slots.acquire()
+        with self._cond:
+            self._seq += 1
+            seq = self._seq
+            self._pending.setdefault(job_id, set()).add(seq)
+
+        try:
+            future = executor.submit(score_and_diff, **task)
+        except BrokenProcessPool:
+            # Broken before this page got in: restart, score this one here
+            self._discard_executor(executor)
+            future = None
+        except Exception:
+            self._finished(job_id, seq)
+            raise
+
+        def _callback(fut):
+            try:
+                try:
+                    if fut is None:
+                        raise BrokenProcessPool("executor already broken")
+                    result = fut.result()
+                except BrokenProcessPool:
+                    self._discard_executor(executor)
+                    # Lost with the dead process: score it here instead
+                    result = _score_inline(task)
+                except Exception as e:
+                    result = {"error": f"compare worker failed: {e}"}
+                on_done(result)
+            except Exception as e:
+                print(f"[COMPARE]   [ERROR] Result handling failed for {task.get('url')}: {e}")
+            finally:
+                self._finished(job_id, seq)
+
+        if future is None:
+            _callback(None)
+        else:
+            future.add_done_callback(_callback)
+
+    def _finished(self, job_id, seq):
+        self._slots.release()
+        with self._cond:
+            pending = self._pending[job_id]
+            pending.discard(seq)
+            if not pending:
+                del self._pending[job_id]
+            self._cond.notify_all()
+
+    def drain(self, job_id):
+        """Wait until every page submitted for ``job_id`` has been recorded."""
+        with self._cond:
+            while self._pending.get(job_id):
+                self._cond.wait()
+
+    def barrier(self, job_id):
+        """Wait until every page submitted for ``job_id`` so far has been recorded."""
+        with self._cond:
+            target = self._seq
+            while any(seq <= target for seq in self._pending.get(job_id, ())):
+                self._cond.wait()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -0,0 +1,40 @@
+"""
+Targeted COMPARE: the fixed set of pages a monitoring cycle re-checks.
+
+CompareEngine only acts on URLs with a selected defacement_sites row, so
+a COMPARE cycle only has to fetch those. A full link-discovering crawl
+still runs every COMPARE_DISCOVERY_INTERVAL seconds per site, so new
+pages keep showing up in crawl_pages for selection.
+"""
+
+import time
+from pathlib import Path
+
+from crawler.config import COMPARE_DISCOVERY_INTERVAL, COMPARE_DISCOVERY_DIR
+
+
+def _marker(siteid) -> Path:
+    return Path(COMPARE_DISCOVERY_DIR) / str(siteid)
+
+
+def discovery_due(siteid) -> bool:
+    """True if the site has not had a full COMPARE crawl within the interval."""
+    if not COMPARE_DISCOVERY_INTERVAL:
+        return False
+    try:
+        last = _marker(siteid).stat().st_mtime
+    except FileNotFoundError:
+        return True
+    return time.time() - last >= COMPARE_DISCOVERY_INTERVAL
+
+
+def mark_discovered(siteid):
+    marker = _marker(siteid)
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    marker.touch()
+
+
+def compare_targets(siteid, index):
+    """Selected URLs for ``siteid`` from a DefacementIndex (loaded if needed)."""
+    index.ensure_loaded()
+    return index.site_urls(siteid)
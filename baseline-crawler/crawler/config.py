@@ -16,6 +16,10 @@ MAX_PAGES = 100
 # Empty = restrict to seed domains only
 ALLOWED_DOMAINS = []
 
+# Extra per-site path block rules, merged over the defaults in
+# crawler/url_filter.py: {siteid: {"RULE_NAME": r"regex"}}
+SITE_PATH_BLOCK_RULES = {}
+
 # Network timeout for HTTP requests (seconds)
 REQUEST_TIMEOUT = 10
 
@@ -36,6 +40,178 @@ except NameError:
     import os
     DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
 
-# Worker scaling parameters
+# JS render cache: in-memory byte budget, and optional on-disk tier
+# shared across runs (None = memory only, e.g. Path(DATA_DIR) /
+# "render_cache"). Used by BASELINE and CRAWL only; COMPARE always
+# renders the live page.
+RENDER_CACHE_MAX_BYTES = 256 * 1024 * 1024
+RENDER_CACHE_DIR = None
+# Disk tier cap: expired files are swept periodically, then the oldest
+# are removed until the tier fits
+RENDER_CACHE_DISK_MAX_BYTES = 1024 * 1024 * 1024
+
+# Multi-site scheduling: sites crawled concurrently, total crawl worker
+# threads shared by all of them, and concurrent fetches per host.
+# The budget must exceed SITE_CONCURRENCY * MIN_WORKERS, or every slot
+# goes to the sites' minimums and the autoscaler can never add workers.
+SITE_CONCURRENCY = 4
+GLOBAL_WORKER_BUDGET = 40
+PER_HOST_MAX_INFLIGHT = 4
+
+# Worker scaling parameters (single source; main.py and the
+# autoscaler both read these)
+# Each site starts with MIN_WORKERS and never exceeds MAX_WORKERS
 MIN_WORKERS = 5
-MAX_WORKERS = 50
+MAX_WORKERS = 20
+# Scale up when more than SCALE_THRESHOLD URLs are queued
+SCALE_THRESHOLD = 100
+# Seconds between autoscaler samples, and workers added/removed per step
+SCALE_INTERVAL = 2.0
+SCALE_STEP = 2
+# Hysteresis: consecutive agreeing samples needed before acting
+SCALE_UP_CHECKS = 2
+SCALE_DOWN_CHECKS = 3
+# Back off when the site slows down or starts failing
+SCALE_MAX_LATENCY_MS = 5000
+SCALE_MAX_ERROR_RATE = 0.2
+
+# Reload selected defacement_sites rows during COMPARE runs (seconds)
+# 0 = load once per process
+DEFACEMENT_REFRESH_SECONDS = 300
+
+# Baseline snapshot compression: "zstd" (falls back to "gz" when the
+# zstandard package is missing), "gz", or "raw"
+SNAPSHOT_CODEC = "zstd"
+
+# COMPARE fast path (opt-in): when the structural fingerprint similarity
+# between baseline and a changed page is at or above this value, full
+# defacement scoring is skipped. The page is still recorded as changed,
+# with FINGERPRINT_SKIP_SEVERITY; its diff follows COMPARE_DIFF_MIN_SCORE. A small
+# injected defacement on a large page can score ~0.97, so keep this
+# strict (e.g. 0.995). None = always score in full, and BASELINE
+# stores no fingerprints.
+FINGERPRINT_SKIP_THRESHOLD = None
+FINGERPRINT_SKIP_SEVERITY = "LOW"
+
+# Changed pages scoring below this defacement percentage are recorded
+# (score, severity) without an HTML diff file. 0 = always write the diff.
+COMPARE_DIFF_MIN_SCORE = 1.0
+
+# JS rendering pool: concurrent Playwright browsers, pending-render
+# backlog before render() blocks, and per-render timeout (seconds)
+JS_RENDER_POOL_SIZE = 4
+JS_RENDER_QUEUE_SIZE = 64
+JS_RENDER_TIMEOUT = 30
+
+# Hydration settle detection: DOM must stay quiet (no mutations, no
+# fetch/XHR in flight) for JS_SETTLE_QUIET_MS; never wait longer than
+# JS_SETTLE_MAX_MS after domcontentloaded
+JS_SETTLE_QUIET_MS = 300
+JS_SETTLE_MAX_MS = 9000
+
+# Subresources aborted during JS rendering. Comparison only needs the
+# final DOM, so images, fonts, media and trackers are never loaded.
+JS_BLOCK_RESOURCE_TYPES = ("image", "font", "media")
+JS_BLOCK_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googlesyndication.com",
+    "doubleclick.net",
+    "facebook.net",
+    "connect.facebook.com",
+    "hotjar.com",
+    "clarity.ms",
+    "analytics.tiktok.com",
+    "snap.licdn.com",
+)
+
+# Write-behind DB writer: rows per executemany() batch, max seconds a row
+# waits before being flushed, and queued rows before producers block
+DB_WRITE_BATCH_SIZE = 200
+DB_WRITE_FLUSH_SECONDS = 2.0
+DB_WRITE_QUEUE_SIZE = 5000
+
+# Async crawl engine (CRAWL_ENGINE=ASYNC): upper bound on concurrent
+# fetches per site job, and threads for the blocking per-page work (JS
+# render hand-off, hashing, DB writes) that runs off the event loop.
+# Fetches per host are limited only by PER_HOST_MAX_INFLIGHT, shared with
+# the threaded workers, so a job's effective concurrency is
+# min(ASYNC_MAX_CONCURRENCY, PER_HOST_MAX_INFLIGHT * hosts crawled).
+ASYNC_MAX_CONCURRENCY = 200
+ASYNC_HANDLER_THREADS = 16
+
+# Link canonicalization before enqueue (see crawler/url_canon.py).
+# Query params dropped (regex, matched against the param name)
+URL_CANON_DROP_PARAMS = (
+    r"utm_\w+",
+    r"fbclid",
+    r"gclid",
+    r"msclkid",
+    r"mc_(cid|eid)",
+    r"_ga",
+    r"_gl",
+    r"replytocom",
+)
+# Sort remaining query params so ?a=1&b=2 and ?b=2&a=1 are one URL
+URL_CANON_SORT_QUERY = True
+# Whole URLs always dropped (rule name -> regex)
+URL_CANON_DROP_URL_PATTERNS = {}
+# CMS aliases of a page (rule name -> regex), dropped only once the page
+# they stand for was seen under its permalink, announced there as
+# <link rel="shortlink">. On sites where ?p=<id> is the permalink no page
+# announces it, so those URLs are still crawled.
+URL_CANON_ALIAS_PATTERNS = {
+    "WP_SHORTLINK": r"\?(?:[^#]*&)?p=\d+(?:[&#]|$)",
+}
+
+# Compact per-job URL sets (see crawler/visited_set.py): initial slots of
+# the 64-bit key table, and the optional Bloom filter in front of it
+VISITED_SET_INITIAL_CAPACITY = 4096
+VISITED_SET_BLOOM = False
+VISITED_BLOOM_EXPECTED = 1_000_000
+VISITED_BLOOM_FP_RATE = 0.01
+
+# Blocked-link report: distinct URLs kept as a sample per block rule
+# (everything else is only counted)
+BLOCK_REPORT_SAMPLE_SIZE = 20
+
+# Persistent frontier (FRONTIER_PERSIST=1, see crawler/frontier_journal.py):
+# one SQLite checkpoint per site and crawl mode, written in batches
+FRONTIER_DIR = Path(DATA_DIR) / "frontier"
+FRONTIER_CHECKPOINT_BATCH = 500
+FRONTIER_CHECKPOINT_SECONDS = 5.0
+FRONTIER_CHECKPOINT_QUEUE_SIZE = 10000
+# Oldest interrupted job (seconds since it started) that is resumed, per
+# crawl mode; older checkpoints are discarded. Keep COMPARE below the
+# monitoring cycle, or a new cycle skips pages the old one compared.
+FRONTIER_RESUME_MAX_AGE = {
+    "BASELINE": 24 * 3600,
+    "CRAWL": 24 * 3600,
+    "COMPARE": 3600,
+}
+
+# Targeted COMPARE (COMPARE_SCOPE=TARGETED): fetch only the selected
+# defacement_sites URLs; every COMPARE_DISCOVERY_INTERVAL seconds a site
+# gets one full link-discovering crawl instead (0 = never)
+COMPARE_DISCOVERY_INTERVAL = 24 * 3600
+COMPARE_DISCOVERY_DIR = Path(DATA_DIR) / "compare_discovery"
+
+# Learned JS-render decisions (see crawler/render_advisor.py): a path
+# template whose renders never changed links or content hash after
+# RENDER_LEARN_MIN_SAMPLES renders skips the browser; every
+# RENDER_LEARN_PROBE_EVERY-th skip renders anyway to re-check
+RENDER_LEARN_MIN_SAMPLES = 3
+RENDER_LEARN_PROBE_EVERY = 25
+RENDER_DECISIONS_DIR = Path(DATA_DIR) / "render_decisions"
+
+# Process pool for CPU-heavy COMPARE work (defacement scoring + HTML
+# diff): worker processes (None = one per CPU core, 0 = run inline on
+# the crawl thread) and pages in flight before crawl threads block
+COMPARE_POOL_WORKERS = None
+COMPARE_POOL_QUEUE_SIZE = 32
+
+# Per-job stage metrics (see crawler/metrics.py), written at job end as
+# <job_id>.json and/or site_<siteid>_<mode>.prom (overwritten by each job
+# of that site and mode); empty tuple disables the export
+METRICS_DIR = Path(DATA_DIR) / "metrics"
+METRICS_EXPORT = ("json", "prometheus")
@@ -1,4 +1,8 @@
 # crawler/db/defacement_sites.py
+import threading
+import time
+
+from crawler.normalizer import normalize_url
 from crawler.storage.mysql import get_connection
 from crawler.storage.db_guard import DB_SEMAPHORE
 
@@ -24,3 +28,107 @@ def get_selected_defacement_rows():
         cur.close()
         conn.close()
         DB_SEMAPHORE.release()
+
+
+# ==================================================
+# IN-MEMORY URL INDEX
+# ==================================================
+
+def _index_key(canon_url: str) -> str:
+    # Slash-insensitive key: "/about" and "/about/" share one bucket
+    return canon_url.rstrip("/")
+
+
+class DefacementIndex:
+    """Hashed lookup of selected defacement rows by canonical URL.
+
+    Rows are canonicalized once at load time so each fetched page costs a
+    single dict lookup instead of a scan over every row. ``refresh()``
+    reloads ``defacement_sites`` and only normalizes URLs it has not seen
+    before, so it is cheap enough to call mid-run.
+    """
+
+    def __init__(self, loader=get_selected_defacement_rows):
+        self._loader = loader
+        self._load_lock = threading.Lock()
+        self._by_key = {}
+        self._canon_cache = {}
+        self._row_count = 0
+        self.loaded_at = None
+
+    def __len__(self):
+        return self._row_count
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def _canon(self, raw_url: str) -> str:
+        canon = self._canon_cache.get(raw_url)
+        if canon is None:
+            canon = normalize_url(raw_url)
+            self._canon_cache[raw_url] = canon
+        return canon
+
+    def _stale(self, max_age: float) -> bool:
+        if not self.loaded:
+            return True
+        return bool(max_age) and time.time() - self.loaded_at > max_age
+
+    def refresh(self):
+        """Reload rows and rebuild the index. Returns (added, removed)."""
+        with self._load_lock:
+            return self._rebuild()
+
+    def ensure_loaded(self, max_age: float = 0):
+        """Load on first use; reload when older than ``max_age`` seconds (0 = never)."""
+        if not self._stale(max_age):
+            return
+        with self._load_lock:
+            if not self._stale(max_age):
+                return
+            first_load = not self.loaded
+            added, removed = self._rebuild()
+            if first_load:
+                print(f"[COMPARE] Loaded {len(self)} defacement row(s)")
+            elif added or removed:
+                print(f"[COMPARE] Defacement rows refreshed: +{added} / -{removed}")
+
+    def _rebuild(self):
+        rows = self._loader() or []
+
+        by_key = {}
+        seen_urls = set()
+        for row in rows:
+            raw_url = row["url"]
+            seen_urls.add(raw_url)
+            by_key.setdefault(_index_key(self._canon(raw_url)), []).append(row)
+
+        # Drop canonical forms of URLs that left the table
+        for raw_url in list(self._canon_cache):
+            if raw_url not in seen_urls:
+                del self._canon_cache[raw_url]
+
+        old = {(k, r["baseline_id"]) for k, bucket in self._by_key.items() for r in bucket}
+        new = {(k, r["baseline_id"]) for k, bucket in by_key.items() for r in bucket}
+
+        # Single reference swap: readers never see a half-built index
+        self._by_key = by_key
+        self._row_count = len(rows)
+        self.loaded_at = time.time()
+
+        return len(new - old), len(old - new)
+
+    def site_urls(self, siteid):
+        """Canonical URLs of the selected rows for ``siteid``, one per page."""
+        urls = {}
+        for bucket in self._by_key.values():
+            for row in bucket:
+                if str(row["siteid"]) == str(siteid):
+                    canon = self._canon_cache.get(row["url"]) or normalize_url(row["url"])
+                    urls.setdefault(_index_key(canon), canon)
+        return sorted(urls.values())
+
+    def lookup(self, canon_url: str):
+        """Return the rows matching ``canon_url`` (with or without trailing slash)."""
+        return self._by_key.get(_index_key(canon_url), ())
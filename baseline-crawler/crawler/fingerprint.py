@@ -0,0 +1,105 @@
+"""
+Cheap structural fingerprints for the COMPARE fast path.
+
+A page is reduced to two bottom-k MinHash sketches: one over 4-word text
+shingles, one over DOM tag paths. Comparing two sketches estimates the
+Jaccard similarity of the underlying sets in O(k), so near-identical
+pages (rotating tokens, timestamps) can skip the full HTML diff.
+"""
+
+import hashlib
+import heapq
+import re
+from html.parser import HTMLParser
+
+SKETCH_SIZE = 128
+SHINGLE_WORDS = 4
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Content of these tags never reaches the rendered text
+_SKIP_TEXT_TAGS = {"script", "style", "noscript", "template"}
+
+# Void elements never get an end tag
+_VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+
+
+def _h64(token: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(token.encode("utf-8", errors="ignore"), digest_size=8).digest(),
+        "big",
+    )
+
+
+class _Extractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []
+        self.paths = set()
+        self.words = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _VOID_TAGS:
+            self.paths.add(">".join(self.stack[-4:] + [tag]))
+            return
+        self.stack.append(tag)
+        self.paths.add(">".join(self.stack[-5:]))
+
+    def handle_endtag(self, tag):
+        # Tolerate unbalanced markup: pop back to the matching open tag
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i] == tag:
+                del self.stack[i:]
+                return
+
+    def handle_data(self, data):
+        if self.stack and self.stack[-1] in _SKIP_TEXT_TAGS:
+            return
+        self.words.extend(_WORD_RE.findall(data.lower()))
+
+
+def _sketch(tokens) -> list:
+    return sorted(heapq.nsmallest(SKETCH_SIZE, {_h64(t) for t in tokens}))
+
+
+def page_fingerprint(html: str) -> dict:
+    """Return {"text": [...], "tags": [...]} sketches for ``html``."""
+    ex = _Extractor()
+    try:
+        ex.feed(html)
+        ex.close()
+    except Exception:
+        pass
+
+    words = ex.words
+    if len(words) < SHINGLE_WORDS:
+        shingles = [" ".join(words)] if words else []
+    else:
+        shingles = (
+            " ".join(words[i:i + SHINGLE_WORDS])
+            for i in range(len(words) - SHINGLE_WORDS + 1)
+        )
+
+    return {"text": _sketch(shingles), "tags": _sketch(ex.paths)}
+
+
+def _jaccard(a: list, b: list) -> float:
+    if not a and not b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    sa, sb = set(a), set(b)
+    union_k = heapq.nsmallest(SKETCH_SIZE, sa | sb)
+    both = sum(1 for h in union_k if h in sa and h in sb)
+    return both / len(union_k)
+
+
+def fingerprint_similarity(fp_a: dict, fp_b: dict) -> float:
+    """Estimated similarity in [0, 1]; the weaker of text and structure."""
+    return min(
+        _jaccard(fp_a.get("text", []), fp_b.get("text", [])),
+        _jaccard(fp_a.get("tags", []), fp_b.get("tags", [])),
+    )
@@ -0,0 +1,299 @@
+"""
+On-disk checkpoint of a crawl job's frontier, so an interrupted job can
+resume instead of recrawling from the seed.
+
+PersistentFrontier wraps a Frontier and journals every first-time
+enqueue and every visit to a per-site SQLite file. Writes happen on a
+background thread in batches (FRONTIER_CHECKPOINT_BATCH rows or
+FRONTIER_CHECKPOINT_SECONDS), so crawl threads never wait on disk.
+
+On resume, URLs visited before the interruption are skipped and the ones
+still pending are re-enqueued. Only a checkpoint of the same site and
+mode younger than FRONTIER_RESUME_MAX_AGE is resumed; older ones are
+discarded. The wrapped Frontier's queue is used
+unchanged, so queue.join() completion works exactly as before.
+
+A visit is only committed once the page's rows are in the database: the
+job installs a durability barrier (set_barrier) that waits for its
+compare pool work and DB writer, and the journal calls it before each
+checkpoint that contains visits. If rows failed to write, those visits
+stay pending and the pages are fetched again on resume. At worst the
+last unflushed batch of pages is fetched again.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from crawler.config import (
+    FRONTIER_DIR,
+    FRONTIER_CHECKPOINT_BATCH,
+    FRONTIER_CHECKPOINT_SECONDS,
+    FRONTIER_CHECKPOINT_QUEUE_SIZE,
+)
+from crawler.visited_set import CompactVisitedSet
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS urls (
+    url     TEXT PRIMARY KEY,
+    parent  TEXT,
+    depth   INTEGER NOT NULL,
+    visited INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+_CLOSE = object()
+
+
+def journal_path(siteid, crawl_mode) -> Path:
+    return Path(FRONTIER_DIR) / f"{siteid}-{crawl_mode.lower()}.sqlite"
+
+
+class FrontierJournal(threading.Thread):
+    """Batched SQLite checkpoint for one site's crawl job."""
+
+    def __init__(self, path, name="FrontierJournal"):
+        super().__init__(name=name, daemon=True)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self.queue = queue.Queue(maxsize=FRONTIER_CHECKPOINT_QUEUE_SIZE)
+        self.checkpoints = 0
+        self.failed = 0
+        self._barrier = None
+        self._closed = False
+
+    # ---------------- JOB METADATA ----------------
+
+    def _meta(self) -> dict:
+        return dict(self._conn.execute("SELECT key, value FROM meta"))
+
+    def resumable_job(self, siteid, crawl_mode, max_age):
+        """
+        job_id of the interrupted job to continue, or None.
+
+        Only a job of the same site and mode that started less than
+        ``max_age`` seconds ago is resumed; any other checkpoint is
+        discarded so its visits cannot hide pages from this run.
+        """
+        meta = self._meta()
+        if not meta.get("job_id"):
+            return None
+        try:
+            age = time.time() - float(meta.get("started_at", ""))
+        except ValueError:
+            age = None
+        if (
+            meta.get("siteid") == str(siteid)
+            and meta.get("crawl_mode") == crawl_mode
+            and age is not None
+            and age <= max_age
+        ):
+            return meta["job_id"]
+
+        print(
+            f"[{self.name}] Discarding checkpoint of job {meta['job_id']} "
+            f"(site {meta.get('siteid')}, mode {meta.get('crawl_mode')}, "
+            f"age {'unknown' if age is None else f'{age:.0f}s'})"
+        )
+        with self._conn:
+            self._conn.execute("DELETE FROM urls")
+            self._conn.execute("DELETE FROM meta")
+        return None
+
+    def set_job_id(self, job_id, siteid, crawl_mode):
+        meta = {
+            "job_id": job_id,
+            "siteid": str(siteid),
+            "crawl_mode": crawl_mode,
+            "started_at": repr(time.time()),
+        }
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", meta.items()
+            )
+
+    def load(self):
+        """(visited URLs, pending (url, parent, depth) rows) from earlier runs."""
+        visited = []
+        pending = []
+        for url, parent, depth, was_visited in self._conn.execute(
+            "SELECT url, parent, depth, visited FROM urls"
+        ):
+            if was_visited:
+                visited.append(url)
+            else:
+                pending.append((url, parent, depth))
+        pending.sort(key=lambda row: row[2])
+        return visited, pending
+
+    def set_barrier(self, barrier):
+        """
+        ``barrier()`` makes every row of the pages handled so far durable
+        and returns False if any of them failed to write.
+        """
+        self._barrier = barrier
+
+    # ---------------- PRODUCER API ----------------
+
+    def enqueued(self, url, parent, depth):
+        self._put(("enqueue", url, parent, depth))
+
+    def visited(self, url):
+        self._put(("visit", url))
+
+    def _put(self, item):
+        if not self._closed:
+            self.queue.put(item)
+
+    # ---------------- JOURNAL THREAD ----------------
+
+    def run(self):
+        batch = []
+        deadline = time.monotonic() + FRONTIER_CHECKPOINT_SECONDS
+
+        while True:
+            timeout = max(deadline - time.monotonic(), 0)
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is not None and item is not _CLOSE:
+                batch.append(item)
+                if len(batch) < FRONTIER_CHECKPOINT_BATCH:
+                    continue
+
+            if batch:
+                self._checkpoint(batch)
+                batch = []
+            deadline = time.monotonic() + FRONTIER_CHECKPOINT_SECONDS
+            if item is _CLOSE:
+                return
+
+    def _checkpoint(self, batch):
+        if self._barrier is not None and any(item[0] == "visit" for item in batch):
+            try:
+                durable = self._barrier()
+            except Exception as e:
+                print(f"[{self.name}] Durability barrier failed: {e}")
+                durable = False
+            if not durable:
+                # Leave these pages pending: a resume fetches them again
+                dropped = sum(1 for item in batch if item[0] == "visit")
+                batch = [item for item in batch if item[0] != "visit"]
+                print(f"[{self.name}] {dropped} visit(s) not checkpointed: their rows were not all written")
+
+        # Replayed in order: a URL's enqueue always precedes its visit
+        enqueues = []
+        visits = []
+        try:
+            with self._conn:
+                for item in batch:
+                    if item[0] == "enqueue":
+                        enqueues.append(item[1:])
+                    else:
+                        if enqueues:
+                            self._write_enqueues(enqueues)
+                            enqueues = []
+                        visits.append((item[1],))
+                if enqueues:
+                    self._write_enqueues(enqueues)
+                if visits:
+                    self._conn.executemany(
+                        "INSERT INTO urls (url, depth, visited) VALUES (?, 0, 1) "
+                        "ON CONFLICT(url) DO UPDATE SET visited=1",
+                        visits,
+                    )
+            self.checkpoints += 1
+        except sqlite3.Error as e:
+            self.failed += len(batch)
+            print(f"[{self.name}] Checkpoint of {len(batch)} entries failed: {e}")
+
+    def _write_enqueues(self, rows):
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO urls (url, parent, depth) VALUES (?, ?, ?)", rows
+        )
+
+    # ---------------- LIFECYCLE ----------------
+
+    def close(self, *, completed=False):
+        """Flush and stop. A completed job's journal is deleted."""
+        if not self._closed:
+            self._closed = True
+            if self.is_alive():
+                self.queue.put(_CLOSE)
+                self.join()
+            self._conn.close()
+        if completed:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+class PersistentFrontier:
+    """
+    Frontier wrapper that checkpoints to a FrontierJournal.
+
+    Exposes the Frontier API (enqueue, mark_visited, queue, get_stats);
+    anything else is delegated to the wrapped frontier.
+    """
+
+    def __init__(self, frontier, journal):
+        self._frontier = frontier
+        self.journal = journal
+        self._done_before = CompactVisitedSet()   # visited by an earlier run
+        self._journaled = CompactVisitedSet()     # enqueues already checkpointed
+
+    def restore(self) -> int:
+        """Reload an earlier run's state; returns the number of URLs re-enqueued."""
+        visited, pending = self.journal.load()
+        for url in visited:
+            self._done_before.add(url)
+            self._journaled.add(url)
+        for url, parent, depth in pending:
+            self._journaled.add(url)
+            self._frontier.enqueue(url, parent, depth)
+        return len(pending)
+
+    @property
+    def queue(self):
+        return self._frontier.queue
+
+    @property
+    def resumed_visited(self) -> int:
+        return len(self._done_before)
+
+    def enqueue(self, url, parent, depth):
+        if url in self._done_before:
+            return False
+        accepted = self._frontier.enqueue(url, parent, depth)
+        # Only URLs the Frontier took (not seen, within limits) are pending
+        if accepted and self._journaled.add(url):
+            self.journal.enqueued(url, parent, depth)
+        return accepted
+
+    def mark_visited(self, url, **kwargs):
+        self.journal.visited(url)
+        return self._frontier.mark_visited(url, **kwargs)
+
+    def get_stats(self):
+        stats = dict(self._frontier.get_stats())
+        stats["visited_count"] = stats.get("visited_count", 0) + self.resumed_visited
+        return stats
+
+    def memory_bytes(self) -> int:
+        """Bytes held by this wrapper's URL sets (not the wrapped Frontier's)."""
+        return self._done_before.memory_bytes() + self._journaled.memory_bytes()
+
+    def __getattr__(self, name):
+        return getattr(self._frontier, name)
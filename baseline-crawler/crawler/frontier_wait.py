@@ -0,0 +1,81 @@
+"""
+Blocking dequeue on top of the Frontier.
+
+Frontier.dequeue() returns (item, got_task) immediately, and its
+bookkeeping (in-progress tracking, the task_done() that mark_visited()
+performs for got_task=True) must stay the only way items leave the
+queue. WaitingFrontier keeps that API and adds dequeue(timeout): idle
+workers sleep on a condition that enqueue() signals, instead of polling
+or reading frontier.queue directly.
+
+Stopping is signalled by the workers' own events; wake() only makes
+every waiting worker re-check its event. Nothing but URLs ever goes
+into the work queue, so queue.join() counts real pages only.
+
+Every URL the Frontier accepted is also kept in a CompactVisitedSet
+(64-bit keys), which answers the "seen before?" check for each enqueue,
+so repeat links never reach the Frontier's own URL sets.
+"""
+
+import threading
+import time
+
+from crawler.visited_set import CompactVisitedSet
+
+
+class WaitingFrontier:
+    """
+    Frontier wrapper with a blocking dequeue(timeout).
+
+    Exposes the Frontier API (enqueue, dequeue, mark_visited, queue,
+    get_stats); anything else is delegated to the wrapped frontier.
+    """
+
+    def __init__(self, frontier):
+        self._frontier = frontier
+        self._cond = threading.Condition()
+        self._seen = CompactVisitedSet()   # URLs the Frontier accepted
+
+    @property
+    def queue(self):
+        return self._frontier.queue
+
+    def enqueue(self, url, parent, depth):
+        if url in self._seen:
+            return False
+        accepted = self._frontier.enqueue(url, parent, depth)
+        if accepted:
+            self._seen.add(url)
+        with self._cond:
+            self._cond.notify()
+        return accepted
+
+    def dequeue(self, timeout=None):
+        """
+        (item, got_task) as Frontier.dequeue(), waiting up to ``timeout``
+        seconds (forever if None) for a URL. Returns (None, False) on
+        timeout or when woken with nothing to do.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            item, got_task = self._frontier.dequeue()
+            if got_task:
+                return item, True
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is None or remaining > 0:
+                # enqueue() notifies under the same lock: no lost wake-up
+                self._cond.wait(remaining)
+                item, got_task = self._frontier.dequeue()
+            return (item, True) if got_task else (None, False)
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the compact seen-URL set."""
+        return self._seen.memory_bytes()
+
+    def wake(self):
+        """Wake every waiting dequeue() so workers re-check their stop flag."""
+        with self._cond:
+            self._cond.notify_all()
+
+    def __getattr__(self, name):
+        return getattr(self._frontier, name)
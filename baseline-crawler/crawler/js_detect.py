@@ -3,28 +3,35 @@ Detect whether a page requires JavaScript rendering.
 Used to escalate React / SPA pages only when necessary.
 """
 
-def needs_js_rendering(html: str) -> bool:
-    if not html:
-        return True
+import re
 
-    h = html.lower()
+# Every marker starts with "<", so one case-insensitive pass finds them
+# all without a lowercased copy of the document
+_SPA_ROOTS = ('<div id="root"', '<div id="app"', "<app-root", "<main id=")
+_INTERACTIVE = ("<a ", "<button", "<form")
+_MARKERS = re.compile(
+    "|".join(re.escape(m) for m in _SPA_ROOTS + _INTERACTIVE),
+    re.IGNORECASE,
+)
 
-    # SPA roots (framework-agnostic)
-    if (
-        '<div id="root"' in h or
-        '<div id="app"' in h or
-        '<app-root' in h or
-        '<main id=' in h
-    ):
-        return True
+SPARSE_DOM_CHARS = 3000
 
-    # If DOM is extremely sparse
-    if len(h) < 3000:
+
+def needs_js_rendering(html: str) -> bool:
+    if not html:
         return True
 
-    # If body exists but content is minimal
-    if h.count("<a ") + h.count("<button") + h.count("<form") < 2:
+    # If DOM is extremely sparse
+    if len(html) < SPARSE_DOM_CHARS:
         return True
 
-    return False
+    interactive = 0
+    for m in _MARKERS.finditer(html):
+        token = m.group().lower()
+        # SPA roots (framework-agnostic)
+        if token in _SPA_ROOTS:
+            return True
+        interactive += 1
 
+    # If body exists but content is minimal
+    return interactive < 2
@@ -1,41 +1,118 @@
 import threading
 import queue
-from crawler.js_renderer import render_js_sync
+import time
+from crawler.js_renderer import render_js_sync, close_browser
 from crawler.normalizer import normalize_rendered_html
+from crawler.config import (
+    JS_RENDER_POOL_SIZE,
+    JS_RENDER_QUEUE_SIZE,
+    JS_RENDER_TIMEOUT,
+)
+
+_STOP = object()
+
 
 class JSRenderWorker(threading.Thread):
-    def __init__(self):
-        super().__init__(daemon=True)
-        self.queue = queue.Queue()
-        self.start()
+    """One render thread owning its own Playwright browser."""
+
+    def __init__(self, jobs: queue.Queue, name: str):
+        super().__init__(name=name, daemon=True)
+        self.jobs = jobs
 
     def run(self):
-        while True:
-            url, result_event = self.queue.get()
-            try:
-                html = normalize_rendered_html(render_js_sync(url))
-                result_event["html"] = html
-            except Exception as e:
-                result_event["error"] = e
-            finally:
-                result_event["done"].set()
-
-    
-def render(self, url: str, timeout: int = 30) -> str:
-    event = {
-        "done": threading.Event(),
-        "html": None,
-        "error": None
-    }
-
-    self.queue.put((url, event))
-
-    finished = event["done"].wait(timeout=timeout)
-
-    if not finished:
-        raise TimeoutError(f"JS render timeout for {url}")
-
-    if event["error"]:
-        raise event["error"]
-
-    return event["html"]
+        try:
+            while True:
+                job = self.jobs.get()
+                if job is _STOP:
+                    return
+
+                url, result_event = job
+                result_event["started"] = time.monotonic()
+                try:
+                    # Caller already gave up: don't spend a render on it
+                    if time.monotonic() > result_event["deadline"]:
+                        result_event["error"] = TimeoutError(f"JS render expired in queue for {url}")
+                        continue
+
+                    remaining_ms = int((result_event["deadline"] - time.monotonic()) * 1000)
+                    html = normalize_rendered_html(render_js_sync(url, timeout_ms=max(remaining_ms, 1000)))
+                    result_event["html"] = html
+                except Exception as e:
+                    result_event["error"] = e
+                finally:
+                    result_event["finished"] = time.monotonic()
+                    result_event["done"].set()
+        finally:
+            close_browser()
+
+
+class JSRenderPool:
+    """
+    N concurrent renders behind the same blocking render() call.
+
+    The job queue is bounded: when every render thread is busy and the
+    queue is full, render() waits (up to its timeout) instead of piling
+    up unbounded work.
+
+    Render threads start on the first render(), so importing
+    crawler.worker (e.g. in a compare pool process) starts no threads.
+    """
+
+    def __init__(self, size: int = JS_RENDER_POOL_SIZE, queue_size: int = JS_RENDER_QUEUE_SIZE):
+        self.size = size
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.workers = []
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if not self.workers:
+            with self._start_lock:
+                if not self.workers:
+                    workers = [
+                        JSRenderWorker(self.queue, name=f"JSRender-{i}")
+                        for i in range(self.size)
+                    ]
+                    for w in workers:
+                        w.start()
+                    self.workers = workers
+
+    def render(self, url: str, timeout: int = JS_RENDER_TIMEOUT, metrics=None) -> str:
+        self._ensure_started()
+        submitted = time.monotonic()
+        deadline = submitted + timeout
+        event = {
+            "done": threading.Event(),
+            "html": None,
+            "error": None,
+            "deadline": deadline,
+        }
+
+        try:
+            self.queue.put((url, event), timeout=timeout)
+        except queue.Full:
+            raise TimeoutError(f"JS render queue full for {url}")
+
+        finished = event["done"].wait(timeout=max(deadline - time.monotonic(), 0))
+
+        if not finished:
+            if metrics is not None:
+                metrics.incr("render_timeouts")
+            raise TimeoutError(f"JS render timeout for {url}")
+
+        if metrics is not None:
+            # Queue wait and browser time, as seen from the render thread
+            metrics.observe("render_wait", event["started"] - submitted)
+            metrics.observe("render", event["finished"] - event["started"])
+
+        if event["error"]:
+            raise event["error"]
+
+        return event["html"]
+
+    def shutdown(self):
+        with self._start_lock:
+            workers, self.workers = self.workers, []
+        for _ in workers:
+            self.queue.put(_STOP)
+        for w in workers:
+            w.join()
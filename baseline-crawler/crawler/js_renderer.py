@@ -1,67 +1,231 @@
 """
 Synchronous JS renderer using Playwright.
 Designed for threaded crawlers (NO async in workers).
+
+Playwright's sync API is bound to the thread that started it, so each
+render thread lazily gets its own browser + context.
 """
 
 import threading
+import time
+from urllib.parse import urlparse
 from playwright.sync_api import sync_playwright
 
-_browser = None
-_context = None
-_lock = threading.Lock()
+from crawler.config import (
+    USER_AGENT,
+    JS_SETTLE_QUIET_MS,
+    JS_SETTLE_MAX_MS,
+    JS_BLOCK_RESOURCE_TYPES,
+    JS_BLOCK_DOMAINS,
+)
+
+_local = threading.local()
+
+
+# ==================================================
+# SETTLE DETECTION
+# ==================================================
+
+# Installed before any page script runs: records the time of the last DOM
+# mutation and counts in-flight fetch/XHR requests.
+_SETTLE_SCRIPT = """
+(() => {
+  const s = window.__settle = { last: performance.now(), inflight: 0 };
+  const touch = () => { s.last = performance.now(); };
+  new MutationObserver(touch).observe(document, {
+    childList: true, subtree: true, attributes: true, characterData: true,
+  });
+
+  const origFetch = window.fetch;
+  if (origFetch) {
+    window.fetch = function () {
+      s.inflight++; touch();
+      return origFetch.apply(this, arguments).finally(() => { s.inflight--; touch(); });
+    };
+  }
+
+  const origSend = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.send = function () {
+    s.inflight++; touch();
+    this.addEventListener("loadend", () => { s.inflight--; touch(); }, { once: true });
+    return origSend.apply(this, arguments);
+  };
+})();
+"""
+
+_SETTLED_JS = """
+(quietMs) => {
+  const s = window.__settle;
+  if (!s) return true;
+  return document.body && document.body.children.length > 0
+    && s.inflight <= 0
+    && performance.now() - s.last >= quietMs;
+}
+"""
+
+# Per-domain learned settle times (ms), exponentially weighted
+_settle_ms = {}
+_settle_lock = threading.Lock()
+SETTLE_EWMA_ALPHA = 0.3
+
+
+def _settle_budget_ms(host: str) -> int:
+    """How long to wait for this host to settle before giving up."""
+    learned = _settle_ms.get(host)
+    if learned is None:
+        return JS_SETTLE_MAX_MS
+    # Generous margin over what the host usually needs, never above the hard cap
+    return int(min(JS_SETTLE_MAX_MS, max(learned * 2 + JS_SETTLE_QUIET_MS, 1000)))
+
+
+def _record_settle(host: str, elapsed_ms: float):
+    with _settle_lock:
+        prev = _settle_ms.get(host)
+        _settle_ms[host] = (
+            elapsed_ms if prev is None
+            else prev + SETTLE_EWMA_ALPHA * (elapsed_ms - prev)
+        )
+
+
+def get_settle_times() -> dict:
+    """Snapshot of learned per-domain settle times (ms)."""
+    with _settle_lock:
+        return dict(_settle_ms)
 
 
 def _ensure_browser():
-    global _browser, _context
+    if getattr(_local, "context", None) is not None:
+        return _local.context
+
+    p = sync_playwright().start()
+    browser = p.chromium.launch(
+        headless=True,
+        args=[
+            "--disable-gpu",
+            "--no-sandbox",
+            "--disable-dev-shm-usage",
+        ],
+    )
+    _local.playwright = p
+    _local.browser = browser
+    _local.context = browser.new_context(user_agent=USER_AGENT)
+    _local.context.add_init_script(_SETTLE_SCRIPT)
+    return _local.context
 
-    if _browser and _context:
+
+def close_browser():
+    """Shut down this thread's browser (no-op if it never rendered)."""
+    context = getattr(_local, "context", None)
+    if context is None:
         return
+    try:
+        context.close()
+        _local.browser.close()
+        _local.playwright.stop()
+    finally:
+        _local.context = None
+        _local.browser = None
+        _local.playwright = None
+
+
+# ==================================================
+# REQUEST BLOCKING
+# ==================================================
+
+_BLOCK_TYPES = frozenset(JS_BLOCK_RESOURCE_TYPES)
+_BLOCK_DOMAINS = tuple(d.lower().lstrip(".") for d in JS_BLOCK_DOMAINS)
+
+RENDER_STATS = {
+    "renders": 0,
+    "requests_total": 0,
+    "requests_blocked": 0,
+    "bytes_loaded": 0,
+}
+_stats_lock = threading.Lock()
+
+
+def _blocked_domain(host: str) -> bool:
+    return any(host == d or host.endswith("." + d) for d in _BLOCK_DOMAINS)
+
+
+def _block_reason(request):
+    if request.resource_type in _BLOCK_TYPES:
+        return request.resource_type
+    host = urlparse(request.url).hostname or ""
+    if _blocked_domain(host.lower()):
+        return "tracker"
+    return None
+
 
-    with _lock:
-        if _browser and _context:
+def _install_blocking(page, counters: dict):
+    def _route(route, request):
+        counters["requests"] += 1
+        reason = _block_reason(request)
+        if reason is None:
+            route.continue_()
             return
+        counters["blocked"] += 1
+        counters["by_reason"][reason] = counters["by_reason"].get(reason, 0) + 1
+        route.abort()
 
-        p = sync_playwright().start()
-        _browser = p.chromium.launch(
-            headless=True,
-            args=[
-                "--disable-gpu",
-                "--no-sandbox",
-                "--disable-dev-shm-usage",
-            ],
-        )
-        _context = _browser.new_context(
-            user_agent=(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/120.0 Safari/537.36"
-            )
+    def _on_response(response):
+        # Content-Length is cheap to read; chunked responses count as 0
+        try:
+            counters["bytes_loaded"] += int(response.headers.get("content-length", 0))
+        except ValueError:
+            pass
+
+    page.route("**/*", _route)
+    page.on("response", _on_response)
+
+
+def _record_render(url: str, counters: dict):
+    with _stats_lock:
+        RENDER_STATS["renders"] += 1
+        RENDER_STATS["requests_total"] += counters["requests"]
+        RENDER_STATS["requests_blocked"] += counters["blocked"]
+        RENDER_STATS["bytes_loaded"] += counters["bytes_loaded"]
+
+    if counters["blocked"]:
+        detail = ", ".join(f"{k}={v}" for k, v in sorted(counters["by_reason"].items()))
+        print(
+            f"[JS] {url}: blocked {counters['blocked']}/{counters['requests']} "
+            f"requests ({detail}), loaded {counters['bytes_loaded']} bytes"
         )
 
 
-def render_js_sync(url: str) -> str:
+def render_js_sync(url: str, timeout_ms: int = 30000) -> str:
     """
     Render a URL using Playwright and return rendered HTML.
     Blocks the calling thread briefly.
     """
-    _ensure_browser()
+    context = _ensure_browser()
 
-    page = _context.new_page()
+    page = context.new_page()
+    page.set_default_timeout(timeout_ms)
+    counters = {"requests": 0, "blocked": 0, "bytes_loaded": 0, "by_reason": {}}
+    _install_blocking(page, counters)
     try:
-        page.goto(url, wait_until="domcontentloaded", timeout=30000)
+        page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
 
-        # Wait for React/Vue/Angular hydration
+        # Wait for React/Vue/Angular hydration: DOM quiet for
+        # JS_SETTLE_QUIET_MS with no fetch/XHR in flight, bounded per host
+        host = urlparse(url).netloc.lower()
+        started = time.monotonic()
         try:
             page.wait_for_function(
-                "() => document.body && document.body.children.length > 0",
-                timeout=8000,
+                _SETTLED_JS,
+                arg=JS_SETTLE_QUIET_MS,
+                timeout=min(_settle_budget_ms(host), timeout_ms),
+                polling=50,
             )
+            _record_settle(host, (time.monotonic() - started) * 1000)
         except Exception:
-            pass
-
-        # Extra micro-wait for React commit phase
-        page.wait_for_timeout(1000)
+            # Never settled within budget: learn the cap so the next
+            # render of this host does not expect it to be fast
+            _record_settle(host, JS_SETTLE_MAX_MS)
 
         return page.content()
     finally:
         page.close()
+        _record_render(url, counters)
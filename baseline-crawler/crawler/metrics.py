@@ -0,0 +1,199 @@
+"""
+Per-job stage timers and counters for the crawl pipeline.
+
+Every crawl job gets a JobMetrics (metrics_for(job_id)) shared by its
+workers, render hand-offs, compare engine and DB writer. Each stage
+observation is two perf_counter() reads, a bisect into fixed histogram
+buckets and a short lock, cheap enough to leave on in production.
+
+At job end main.py writes the job's histograms under METRICS_DIR: a JSON
+summary per job (<job_id>.json) and one Prometheus text exposition file
+per site and crawl mode (site_<siteid>_<mode>.prom, for the
+node_exporter textfile collector) that each job of that mode overwrites.
+The .prom series carry no job_id label, so the collector sees a fixed
+set of series per site and mode rather than a new set per job. It also prints the slowest stages.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+
+from crawler.config import METRICS_DIR, METRICS_EXPORT
+
+# Histogram upper bounds in seconds (Prometheus "le" buckets)
+BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+    0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+class _Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)   # last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else self.max
+        return self.max
+
+
+class JobMetrics:
+    def __init__(self, job_id, labels=None):
+        self.job_id = job_id
+        self.labels = dict(labels or {})
+        self.started = time.time()
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            hist = self._stages.get(stage)
+            if hist is None:
+                hist = self._stages[stage] = _Histogram()
+            hist.observe(seconds)
+
+    @contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def incr(self, counter: str, n: int = 1):
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + n
+
+    # ---------------- EXPORT ----------------
+
+    def summary(self) -> dict:
+        with self._lock:
+            stages = {
+                name: {
+                    "count": h.count,
+                    "total_s": round(h.total, 3),
+                    "mean_ms": round(h.total / h.count * 1000, 2) if h.count else 0.0,
+                    "p50_ms": round(h.quantile(0.5) * 1000, 2),
+                    "p90_ms": round(h.quantile(0.9) * 1000, 2),
+                    "p99_ms": round(h.quantile(0.99) * 1000, 2),
+                    "max_ms": round(h.max * 1000, 2),
+                }
+                for name, h in self._stages.items()
+            }
+            counters = dict(self._counters)
+        return {
+            "job_id": self.job_id,
+            "labels": self.labels,
+            "wall_s": round(time.time() - self.started, 3),
+            "stages": stages,
+            "counters": counters,
+        }
+
+    def prometheus_text(self) -> str:
+        # No job_id: one bounded set of series per site
+        base = {k: str(v) for k, v in self.labels.items()}
+
+        def fmt(extra):
+            labels = {**base, **extra}
+            return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+        lines = [
+            "# HELP crawler_stage_seconds Time spent per crawl pipeline stage.",
+            "# TYPE crawler_stage_seconds histogram",
+        ]
+        with self._lock:
+            for stage, h in sorted(self._stages.items()):
+                cumulative = 0
+                for bound, n in zip(BUCKETS, h.counts):
+                    cumulative += n
+                    lines.append(f"crawler_stage_seconds_bucket{fmt({'stage': stage, 'le': bound})} {cumulative}")
+                lines.append(f"crawler_stage_seconds_bucket{fmt({'stage': stage, 'le': '+Inf'})} {h.count}")
+                lines.append(f"crawler_stage_seconds_sum{fmt({'stage': stage})} {h.total:.6f}")
+                lines.append(f"crawler_stage_seconds_count{fmt({'stage': stage})} {h.count}")
+
+            lines.append("# HELP crawler_events_total Crawl pipeline event counters.")
+            lines.append("# TYPE crawler_events_total counter")
+            for name, value in sorted(self._counters.items()):
+                lines.append(f"crawler_events_total{fmt({'event': name})} {value}")
+        return "\n".join(lines) + "\n"
+
+    def _prom_name(self) -> str:
+        siteid = self.labels.get("siteid")
+        if siteid is None:
+            return f"{self.job_id}.prom"
+        # BASELINE and COMPARE of one site keep separate series files
+        mode = self.labels.get("mode")
+        return f"site_{siteid}_{mode.lower()}.prom" if mode else f"site_{siteid}.prom"
+
+    def export(self, directory=None, formats=None):
+        """
+        Write <job_id>.json / site_<siteid>_<mode>.prom (defaults:
+        METRICS_DIR, METRICS_EXPORT); returns the paths written.
+        """
+        directory = METRICS_DIR if directory is None else directory
+        formats = METRICS_EXPORT if formats is None else formats
+        if not directory or not formats:
+            return []
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        written = []
+        for fmt in formats:
+            if fmt == "json":
+                path, data = directory / f"{self.job_id}.json", json.dumps(self.summary(), indent=2)
+            elif fmt == "prometheus":
+                path, data = directory / self._prom_name(), self.prometheus_text()
+            else:
+                continue
+            tmp = path.with_suffix(path.suffix + ".tmp")
+            tmp.write_text(data, encoding="utf-8")
+            os.replace(tmp, path)
+            written.append(path)
+        return written
+
+
+# ==================================================
+# PER-JOB REGISTRY
+# ==================================================
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def metrics_for(job_id, labels=None) -> JobMetrics:
+    """The job's JobMetrics, created on first use."""
+    m = _registry.get(job_id)
+    if m is None:
+        with _registry_lock:
+            m = _registry.get(job_id)
+            if m is None:
+                m = _registry[job_id] = JobMetrics(job_id, labels)
+    return m
+
+
+def pop_metrics(job_id):
+    with _registry_lock:
+        return _registry.pop(job_id, None)
@@ -0,0 +1,49 @@
+"""
+One content hash per fetched page.
+
+The normalized HTML is built once, hashed and dropped before the page
+moves on; BASELINE storage and COMPARE both take the resulting hash
+instead of normalizing the page again. The size of the copies alive at
+that moment (raw body, decoded HTML, normalized HTML) is recorded per
+job so the peak per-page footprint can be reported.
+"""
+
+import sys
+import threading
+
+from crawler.normalizer import normalize_html
+from crawler.hasher import sha256
+
+_lock = threading.Lock()
+_job_memory = {}   # job_id -> [pages, total_bytes, peak_bytes, peak_url]
+
+
+def page_content_hash(html: str, *, job_id=None, url=None, raw_bytes: int = 0) -> str:
+    """sha256 of normalize_html(html), same value as stored in baseline_pages."""
+    normalized = normalize_html(html)
+    content_hash = sha256(normalized)
+    if job_id is not None:
+        _record(job_id, url, raw_bytes + sys.getsizeof(html) + sys.getsizeof(normalized))
+    return content_hash
+
+
+def _record(job_id, url, nbytes):
+    with _lock:
+        stats = _job_memory.setdefault(job_id, [0, 0, 0, None])
+        stats[0] += 1
+        stats[1] += nbytes
+        if nbytes > stats[2]:
+            stats[2] = nbytes
+            stats[3] = url
+
+
+def pop_page_memory(job_id) -> dict:
+    """Per-page memory summary for a finished job (and forget it)."""
+    with _lock:
+        pages, total, peak, peak_url = _job_memory.pop(job_id, (0, 0, 0, None))
+    return {
+        "pages": pages,
+        "mean_bytes": total // pages if pages else 0,
+        "peak_bytes": peak,
+        "peak_url": peak_url,
+    }
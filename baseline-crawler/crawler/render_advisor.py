@@ -0,0 +1,127 @@
+"""
+Per-site memory of whether JS rendering is worth it.
+
+needs_js_rendering() is a cheap guess from the raw HTML; it flags every
+small page and many server-rendered ones. After each real render the
+handler reports whether the render changed the extracted links or the
+content hash. Per path template ("/blog/*", "/product/:n", "/about",
+"/*" for top-level slugs), once RENDER_LEARN_MIN_SAMPLES renders made no
+difference, later pages skip the browser. A periodic probe render keeps
+the decision honest if a template starts depending on JS. Decisions
+persist per site and crawl mode under RENDER_DECISIONS_DIR, so later
+crawls of that mode start from what earlier ones learned; BASELINE
+learning never decides what COMPARE renders.
+"""
+
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from crawler.config import (
+    RENDER_LEARN_MIN_SAMPLES,
+    RENDER_LEARN_PROBE_EVERY,
+    RENDER_DECISIONS_DIR,
+)
+from crawler.js_detect import needs_js_rendering
+
+_NUMERIC = re.compile(r"^\d+$")
+# Generated-looking segments: 3+ hyphen/underscore words (post slugs),
+# long ids, or hex tokens
+_SLUG = re.compile(r"^(?:[^-_]+[-_]){2,}[^-_]+$|^.{32,}$|^(?=.*\d)[0-9a-f]{8,}$", re.IGNORECASE)
+
+
+def _segment(segment: str) -> str:
+    if _NUMERIC.match(segment):
+        return ":n"
+    if _SLUG.match(segment):
+        return "*"
+    return segment.lower()
+
+
+def path_template(url: str) -> str:
+    """
+    First path segment kept unless numeric or slug-like, deeper segments
+    collapsed: /blog/a/b -> /blog/*/*, /about -> /about, /app -> /app,
+    /how-to-fix-it -> /*, /42 -> /:n.
+    """
+    segments = [s for s in urlsplit(url).path.split("/") if s]
+    if not segments:
+        return "/"
+    parts = [_segment(segments[0])]
+    parts += [":n" if _NUMERIC.match(s) else "*" for s in segments[1:]]
+    return "/" + "/".join(parts)
+
+
+class RenderAdvisor:
+    def __init__(self, siteid, crawl_mode, *, directory=RENDER_DECISIONS_DIR):
+        self.siteid = siteid
+        self.crawl_mode = crawl_mode
+        self.path = (
+            Path(directory) / f"{siteid}-{crawl_mode.lower()}.json" if directory else None
+        )
+        self._lock = threading.Lock()
+        # template -> [renders, renders that changed links/hash]
+        self._templates = self._load()
+        self._skips_since_probe = {}
+        self.renders = 0
+        self.avoided = 0
+
+    def _load(self):
+        if self.path is None:
+            return {}
+        try:
+            return {k: list(v) for k, v in json.loads(self.path.read_text(encoding="utf-8")).items()}
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _render_useless(self, template) -> bool:
+        renders, changed = self._templates.get(template, (0, 0))
+        return renders >= RENDER_LEARN_MIN_SAMPLES and changed == 0
+
+    def should_render(self, url: str, html: str) -> bool:
+        if not needs_js_rendering(html):
+            return False
+
+        template = path_template(url)
+        with self._lock:
+            if not self._render_useless(template):
+                return True
+            skips = self._skips_since_probe.get(template, 0) + 1
+            if RENDER_LEARN_PROBE_EVERY and skips >= RENDER_LEARN_PROBE_EVERY:
+                # Re-check now and then in case the template went client-side
+                self._skips_since_probe[template] = 0
+                return True
+            self._skips_since_probe[template] = skips
+            self.avoided += 1
+        return False
+
+    def record(self, url: str, changed: bool):
+        """Outcome of a real render of ``url``."""
+        template = path_template(url)
+        with self._lock:
+            self.renders += 1
+            stats = self._templates.setdefault(template, [0, 0])
+            stats[0] += 1
+            if changed:
+                stats[1] += 1
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "renders": self.renders,
+                "avoided": self.avoided,
+                "skipped_templates": sorted(t for t in self._templates if self._render_useless(t)),
+            }
+
+    def save(self):
+        if self.path is None:
+            return
+        with self._lock:
+            data = json.dumps(self._templates, sort_keys=True)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(data, encoding="utf-8")
+        os.replace(tmp, self.path)
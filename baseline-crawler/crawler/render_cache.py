@@ -1,40 +1,230 @@
 """
-In-memory cache for JS-rendered pages.
+Cache for JS-rendered pages.
 Prevents repeated Playwright renders.
+
+Memory tier: byte-budgeted LRU with TTL and a background expiry sweep.
+Disk tier (optional, RENDER_CACHE_DIR): gzip files keyed by URL hash, so
+a BASELINE or CRAWL rerun reuses renders across processes. The sweeper
+also removes expired files and keeps the tier under
+RENDER_CACHE_DISK_MAX_BYTES, oldest first.
+
+COMPARE never reads or fills this cache: it must see the live page.
 """
 
+import gzip
+import os
 import time
 import threading
 import hashlib
+from collections import OrderedDict
+from pathlib import Path
+
+from crawler.config import (
+    RENDER_CACHE_MAX_BYTES,
+    RENDER_CACHE_DIR,
+    RENDER_CACHE_DISK_MAX_BYTES,
+)
 
 CACHE_TTL_SECONDS = 60 * 60 * 12  # 12 hours
+SWEEP_INTERVAL_SECONDS = 60
+DISK_SWEEP_INTERVAL_SECONDS = 600
 
-_cache = {}
+_cache = OrderedDict()  # key -> (html, ts, size)
+_bytes = 0
 _lock = threading.Lock()
+_sweeper = None
+
+CACHE_STATS = {
+    "hits": 0,
+    "disk_hits": 0,
+    "misses": 0,
+    "evictions": 0,
+    "expirations": 0,
+    "disk_removed": 0,
+}
 
 
 def _cache_key(url: str) -> str:
     return hashlib.sha256(url.encode("utf-8")).hexdigest()
 
 
+def _size(html: str) -> int:
+    # Approximate footprint; avoids encoding the whole string
+    return len(html) * 2
+
+
+# ==================================================
+# MEMORY TIER
+# ==================================================
+
+def _drop(key):
+    global _bytes
+    _html, _ts, size = _cache.pop(key)
+    _bytes -= size
+
+
+def _put(key, html, ts):
+    global _bytes
+    size = _size(html)
+    if size > RENDER_CACHE_MAX_BYTES:
+        return
+    if key in _cache:
+        _drop(key)
+    _cache[key] = (html, ts, size)
+    _bytes += size
+    while _bytes > RENDER_CACHE_MAX_BYTES:
+        _key, (_html, _ts, evicted) = _cache.popitem(last=False)
+        _bytes -= evicted
+        CACHE_STATS["evictions"] += 1
+
+
+def _sweep_expired():
+    now = time.time()
+    with _lock:
+        expired = [k for k, (_h, ts, _s) in _cache.items() if now - ts > CACHE_TTL_SECONDS]
+        for k in expired:
+            _drop(k)
+        CACHE_STATS["expirations"] += len(expired)
+
+
+def _sweep_loop():
+    last_disk_sweep = 0.0
+    while True:
+        now = time.time()
+        if RENDER_CACHE_DIR and now - last_disk_sweep >= DISK_SWEEP_INTERVAL_SECONDS:
+            _sweep_disk(now)
+            last_disk_sweep = now
+        time.sleep(SWEEP_INTERVAL_SECONDS)
+        _sweep_expired()
+
+
+def _ensure_sweeper():
+    global _sweeper
+    if _sweeper is not None:
+        return
+    with _lock:
+        if _sweeper is not None:
+            return
+        _sweeper = threading.Thread(target=_sweep_loop, name="RenderCacheSweeper", daemon=True)
+        _sweeper.start()
+
+
+# ==================================================
+# DISK TIER
+# ==================================================
+
+def _disk_path(key: str):
+    if not RENDER_CACHE_DIR:
+        return None
+    return Path(RENDER_CACHE_DIR) / key[:2] / f"{key}.html.gz"
+
+
+def _disk_get(key: str, now: float):
+    path = _disk_path(key)
+    if path is None:
+        return None
+    try:
+        ts = path.stat().st_mtime
+        if now - ts > CACHE_TTL_SECONDS:
+            path.unlink()
+            return None
+        return gzip.decompress(path.read_bytes()).decode("utf-8"), ts
+    except (FileNotFoundError, OSError, EOFError):
+        return None
+
+
+def _sweep_disk(now: float):
+    """Remove expired files, then the oldest until the tier fits its cap."""
+    kept = []
+    total = 0
+    removed = 0
+    for path in Path(RENDER_CACHE_DIR).glob("*/*.html.gz"):
+        try:
+            st = path.stat()
+            if now - st.st_mtime > CACHE_TTL_SECONDS:
+                path.unlink()
+                removed += 1
+                continue
+        except OSError:
+            continue
+        kept.append((st.st_mtime, st.st_size, path))
+        total += st.st_size
+
+    if total > RENDER_CACHE_DISK_MAX_BYTES:
+        kept.sort()
+        for _mtime, size, path in kept:
+            if total <= RENDER_CACHE_DISK_MAX_BYTES:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+
+    with _lock:
+        CACHE_STATS["disk_removed"] += removed
+
+
+def _disk_set(key: str, html: str):
+    path = _disk_path(key)
+    if path is None:
+        return
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(gzip.compress(html.encode("utf-8"), compresslevel=5))
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"[RENDER_CACHE] Disk write failed for {path}: {e}")
+
+
+# ==================================================
+# PUBLIC API
+# ==================================================
+
 def get_cached_render(url: str):
     key = _cache_key(url)
     now = time.time()
 
     with _lock:
         entry = _cache.get(key)
-        if not entry:
-            return None
+        if entry:
+            html, ts, _ = entry
+            if now - ts <= CACHE_TTL_SECONDS:
+                _cache.move_to_end(key)
+                CACHE_STATS["hits"] += 1
+                return html
+            _drop(key)
+            CACHE_STATS["expirations"] += 1
 
-        html, ts = entry
-        if now - ts > CACHE_TTL_SECONDS:
-            del _cache[key]
+    hit = _disk_get(key, now)
+    with _lock:
+        if hit is None:
+            CACHE_STATS["misses"] += 1
             return None
-
-        return html
+        html, ts = hit
+        CACHE_STATS["disk_hits"] += 1
+        _put(key, html, ts)
+    return html
 
 
 def set_cached_render(url: str, html: str):
     key = _cache_key(url)
     with _lock:
-        _cache[key] = (html, time.time())
+        _put(key, html, time.time())
+    _ensure_sweeper()
+    _disk_set(key, html)
+
+
+def clear_render_cache():
+    """Drop every in-memory render (the disk tier is left alone)."""
+    global _bytes
+    with _lock:
+        _cache.clear()
+        _bytes = 0
+
+
+def get_cache_stats() -> dict:
+    with _lock:
+        return dict(CACHE_STATS, entries=len(_cache), bytes=_bytes)
@@ -0,0 +1,43 @@
+"""
+Conditional GET for pages that have stored validators.
+A 304 means the page is unchanged since the baseline: no body transfer.
+"""
+
+from crawler.fetcher import fetch
+
+
+def extract_validators(resp) -> dict:
+    """Validators worth storing from a 200 response (empty if none)."""
+    etag = resp.headers.get("ETag")
+    last_modified = resp.headers.get("Last-Modified")
+    if not etag and not last_modified:
+        return {}
+    return {
+        "etag": etag,
+        "last_modified": last_modified,
+        "content_length": len(resp.content),
+    }
+
+
+def conditional_headers(validators: dict) -> dict:
+    """If-None-Match / If-Modified-Since for the stored validators."""
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def conditional_fetch(url: str, parent, depth, validators: dict) -> dict:
+    """
+    crawler.fetcher.fetch() with the conditional headers added, so
+    retries, robots handling and default headers still apply. Same
+    result shape, plus "not_modified".
+    """
+    result = fetch(url, parent, depth, headers=conditional_headers(validators))
+    resp = result.get("response")
+    if resp is not None and resp.status_code == 304:
+        return {"success": True, "response": resp, "not_modified": True}
+    result["not_modified"] = False
+    return result
@@ -0,0 +1,94 @@
+"""
+Cross-site scheduling primitives.
+
+WorkerBudget caps the total number of crawl worker threads across all
+sites being crawled at once. host_slot() caps concurrent fetches per
+host, so two sites on the same server are not hammered twice as hard;
+async_host_slot() takes the same slots from the asyncio engine.
+"""
+
+import asyncio
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import urlparse
+
+from crawler.config import PER_HOST_MAX_INFLIGHT
+
+
+class WorkerBudget:
+    """Counting budget of worker slots shared by every site job."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self._used = 0
+        self._cond = threading.Condition()
+
+    @property
+    def used(self) -> int:
+        return self._used
+
+    def acquire(self, n: int = 1):
+        """Block until ``n`` slots are free (``n`` is clamped to the total)."""
+        n = min(n, self.total)
+        with self._cond:
+            while self._used + n > self.total:
+                self._cond.wait()
+            self._used += n
+        return n
+
+    def try_acquire(self, n: int = 1) -> int:
+        """Take up to ``n`` free slots without blocking; returns how many."""
+        with self._cond:
+            granted = max(0, min(n, self.total - self._used))
+            self._used += granted
+        return granted
+
+    def release(self, n: int = 1):
+        with self._cond:
+            self._used = max(0, self._used - n)
+            self._cond.notify_all()
+
+
+# ==================================================
+# PER-HOST POLITENESS
+# ==================================================
+
+_host_slots = {}
+_host_lock = threading.Lock()
+
+
+def host_key(url: str) -> str:
+    host = (urlparse(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def _host_semaphore(url: str) -> threading.BoundedSemaphore:
+    key = host_key(url)
+    sem = _host_slots.get(key)
+    if sem is None:
+        with _host_lock:
+            sem = _host_slots.setdefault(key, threading.BoundedSemaphore(PER_HOST_MAX_INFLIGHT))
+    return sem
+
+
+@contextmanager
+def host_slot(url: str):
+    """Hold one of PER_HOST_MAX_INFLIGHT fetch slots for ``url``'s host."""
+    with _host_semaphore(url):
+        yield
+
+
+@asynccontextmanager
+async def async_host_slot(url: str, executor=None):
+    """
+    host_slot() for coroutines: the same per-host slots, shared with the
+    threaded workers. A contended slot is waited for on ``executor`` so
+    the event loop keeps running.
+    """
+    sem = _host_semaphore(url)
+    if not sem.acquire(blocking=False):
+        await asyncio.get_running_loop().run_in_executor(executor, sem.acquire)
+    try:
+        yield
+    finally:
+        sem.release()
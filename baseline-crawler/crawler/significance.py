@@ -1,8 +1,14 @@
 import hashlib
 
+# Characters encoded per update(): large pages are never copied to bytes whole
+HASH_CHUNK_CHARS = 1 << 16
+
 
 def html_hash(html: str) -> str:
-    return hashlib.sha256(html.encode("utf-8", errors="ignore")).hexdigest()
+    h = hashlib.sha256()
+    for i in range(0, len(html), HASH_CHUNK_CHARS):
+        h.update(html[i:i + HASH_CHUNK_CHARS].encode("utf-8", errors="ignore"))
+    return h.hexdigest()
 
 
 def is_significant_change(baseline_html: str, new_html: str) -> bool:
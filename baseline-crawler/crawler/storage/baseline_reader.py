@@ -1,5 +1,8 @@
 # crawler/baseline_reader.py
 
+import threading
+import time
+
 from crawler.storage.mysql import get_connection
 from crawler.storage.db_guard import DB_SEMAPHORE
 
@@ -31,3 +34,118 @@ def get_baseline_hash(*, site_id: int, normalized_url: str):
         cur.close()
         conn.close()
         DB_SEMAPHORE.release()
+
+
+def get_site_baseline_hashes(*, site_id: int):
+    """
+    Fetch every baseline row for a site in a single query.
+
+    Returns:
+        [{"id": ..., "normalized_url": ..., "content_hash": ...}, ...]
+    """
+    conn = get_connection()
+    try:
+        cur = conn.cursor(dictionary=True)
+        cur.execute(
+            """
+            SELECT id, normalized_url, content_hash
+            FROM baseline_pages
+            WHERE site_id=%s
+            """,
+            (site_id,),
+        )
+        return cur.fetchall()
+    finally:
+        cur.close()
+        conn.close()
+        DB_SEMAPHORE.release()
+
+
+# ==================================================
+# PER-SITE SNAPSHOT (zero DB calls per page)
+# ==================================================
+
+class BaselineHashSnapshot:
+    """
+    In-memory copy of baseline_pages for one site.
+
+    Values are kept as (id, 32-byte digest) tuples rather than row dicts
+    to keep large sites cheap to hold for the whole job. A content_hash
+    that is not hex is kept as the original string so the page still
+    compares (as changed) instead of looking unbaselined.
+    """
+
+    def __init__(self, site_id: int):
+        self.site_id = site_id
+        self._hashes = {}
+        self._lock = threading.Lock()
+        self.loaded_at = None
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def refresh(self):
+        rows = get_site_baseline_hashes(site_id=self.site_id) or []
+        hashes = {}
+        not_hex = 0
+        for row in rows:
+            try:
+                digest = bytes.fromhex(row["content_hash"])
+            except (TypeError, ValueError):
+                not_hex += 1
+                if not_hex <= 5:
+                    print(
+                        f"[BASELINE] Non-hex content_hash for site {self.site_id} "
+                        f"id={row['id']} url={row['normalized_url']}: {row['content_hash']!r}"
+                    )
+                digest = row["content_hash"]
+            hashes[row["normalized_url"]] = (row["id"], digest)
+
+        if not_hex:
+            print(f"[BASELINE] {not_hex} baseline row(s) for site {self.site_id} have a non-hex content_hash")
+
+        with self._lock:
+            self._hashes = hashes
+            self.loaded_at = time.time()
+
+        print(f"[BASELINE] Loaded {len(hashes)} baseline hash(es) for site {self.site_id}")
+        return len(hashes)
+
+    def get(self, normalized_url: str):
+        """Same shape as get_baseline_hash(), or None."""
+        entry = self._hashes.get(normalized_url)
+        if entry is None:
+            return None
+        digest = entry[1]
+        return {
+            "id": entry[0],
+            "content_hash": digest.hex() if isinstance(digest, bytes) else digest,
+        }
+
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+def load_baseline_snapshot(site_id: int) -> BaselineHashSnapshot:
+    """Return the site's snapshot, bulk-loading it on first use."""
+    snap = _snapshots.get(site_id)
+    if snap is not None:
+        return snap
+
+    with _snapshots_lock:
+        snap = _snapshots.get(site_id)
+        if snap is None:
+            snap = BaselineHashSnapshot(site_id)
+            snap.refresh()
+            _snapshots[site_id] = snap
+    return snap
+
+
+def invalidate_baseline_snapshot(site_id: int = None):
+    """Drop one site's snapshot (or all) so the next lookup reloads it."""
+    with _snapshots_lock:
+        if site_id is None:
+            _snapshots.clear()
+        else:
+            _snapshots.pop(site_id, None)
@@ -1,16 +1,34 @@
 # crawler/storage/baseline_store.py
 
+import os
+import threading
 from pathlib import Path
-from crawler.storage.db import insert_defacement_site
-from crawler.storage.mysql import upsert_baseline_hash
-from crawler.normalizer import normalize_html
-from crawler.hasher import sha256
+from crawler.storage.statements import (
+    insert_defacement_site,
+    upsert_baseline_hash,
+)
+from crawler.storage.snapshot_store import (
+    max_snapshot_seq,
+    write_snapshot,
+    has_fingerprint,
+    write_fingerprint,
+)
+from crawler.fingerprint import page_fingerprint
+from crawler.page_digest import page_content_hash
+from crawler.config import FINGERPRINT_SKIP_THRESHOLD
 
 BASELINE_ROOT = Path("baselines")
 
 
-def _next_baseline_id(site_dir: Path, siteid: int) -> str:
-    max_seq = 0
+# IDs are reserved in blocks; the high-water mark on disk is always ahead
+# of any ID handed out, so a crash can leave gaps but never reuse an ID.
+SEQ_FILE = ".baseline_seq"
+SEQ_BLOCK = 64
+
+
+def _scan_max_seq(site_dir: Path, siteid: int) -> int:
+    # Ids in the snapshot index, plus legacy <siteid>-N.html files
+    max_seq = max_snapshot_seq(site_dir=site_dir, siteid=siteid)
     prefix = f"{siteid}-"
 
     for f in site_dir.glob(f"{siteid}-*.html"):
@@ -21,31 +39,106 @@ def _next_baseline_id(site_dir: Path, siteid: int) -> str:
             except ValueError:
                 pass
 
-    return f"{siteid}-{max_seq + 1}"
+    return max_seq
+
+
+class BaselineIdAllocator:
+    """Thread-safe, crash-safe per-site sequence for baseline IDs."""
+
+    def __init__(self, site_dir: Path, siteid: int):
+        self.site_dir = site_dir
+        self.siteid = siteid
+        self._lock = threading.Lock()
+        self._seq_path = site_dir / SEQ_FILE
+
+        # Seed once from the persisted mark and the ids already stored, so
+        # a lost or stale mark can never hand out an existing id
+        persisted = 0
+        try:
+            persisted = int(self._seq_path.read_text().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            pass
+        self._next = max(persisted, _scan_max_seq(site_dir, siteid)) + 1
+        self._reserved = self._next - 1
+
+    def _persist(self, mark: int):
+        tmp = self._seq_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(str(mark))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._seq_path)
+
+    def next_id(self) -> str:
+        with self._lock:
+            if self._next > self._reserved:
+                self._reserved = self._next + SEQ_BLOCK - 1
+                self._persist(self._reserved)
+            seq = self._next
+            self._next += 1
+        return f"{self.siteid}-{seq}"
 
 
-def store_snapshot_file(*, custid, siteid, url, html, crawl_mode):
+_allocators = {}
+_allocators_lock = threading.Lock()
+
+
+def _next_baseline_id(site_dir: Path, siteid: int) -> str:
+    key = str(site_dir.resolve())
+    alloc = _allocators.get(key)
+    if alloc is None:
+        with _allocators_lock:
+            alloc = _allocators.get(key)
+            if alloc is None:
+                alloc = BaselineIdAllocator(site_dir, siteid)
+                _allocators[key] = alloc
+    return alloc.next_id()
+
+
+def store_snapshot_file(*, custid, siteid, url, html, crawl_mode, content_hash=None, writer=None):
     site_dir = BASELINE_ROOT / str(custid) / str(siteid)
     site_dir.mkdir(parents=True, exist_ok=True)
 
     baseline_id = _next_baseline_id(site_dir, siteid)
-    path = site_dir / f"{baseline_id}.html"
-    path.write_text(html.strip(), encoding="utf-8")
+    if content_hash is None:
+        content_hash = page_content_hash(html)
+
+    # One compressed blob per unique snapshot; baseline_id is just a ref
+    path = write_snapshot(
+        site_dir=site_dir,
+        baseline_id=baseline_id,
+        html=html.strip(),
+    )
+
+    # Structural fingerprint for the COMPARE fast path (once per content),
+    # only when that fast path is enabled
+    if (
+        FINGERPRINT_SKIP_THRESHOLD is not None
+        and not has_fingerprint(site_dir=site_dir, content_hash=content_hash)
+    ):
+        write_fingerprint(
+            site_dir=site_dir,
+            content_hash=content_hash,
+            fingerprint=page_fingerprint(html),
+        )
 
     if crawl_mode.upper() == "BASELINE":
-        insert_defacement_site(
+        record = writer.defacement_site if writer else insert_defacement_site
+        record(
             siteid=siteid,
             baseline_id=baseline_id,
             url=url,
         )
 
-    return baseline_id, path.name, str(path)
+    return baseline_id, content_hash, str(path)
 
 
-def store_baseline_hash(*, site_id, normalized_url, raw_html, baseline_path):
-    content_hash = sha256(normalize_html(raw_html))
+def store_baseline_hash(*, site_id, normalized_url, raw_html, baseline_path, content_hash=None, writer=None):
+    if content_hash is None:
+        content_hash = page_content_hash(raw_html)
 
-    upsert_baseline_hash(
+    record = writer.baseline_hash if writer else upsert_baseline_hash
+    record(
         site_id=site_id,
         normalized_url=normalized_url,
         content_hash=content_hash,
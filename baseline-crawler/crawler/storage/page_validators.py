@@ -0,0 +1,106 @@
+# crawler/storage/page_validators.py
+"""
+HTTP cache validators (ETag / Last-Modified) recorded with each baseline
+page, so COMPARE crawls can revalidate instead of re-downloading.
+"""
+
+import hashlib
+import threading
+
+from crawler.storage.mysql import get_connection
+from crawler.storage.db_guard import DB_SEMAPHORE
+from crawler.storage.statements import write_row
+
+
+def validators_url_hash(normalized_url: str) -> str:
+    """Primary-key column: SHA-256 of the URL (a full VARCHAR URL key
+    exceeds InnoDB's 3072-byte index limit under utf8mb4)."""
+    return hashlib.sha256(normalized_url.encode("utf-8")).hexdigest()
+
+
+def ensure_validators_table():
+    """Create page_validators; only BASELINE and COMPARE runs need it."""
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS page_validators (
+                site_id INT NOT NULL,
+                url_hash CHAR(64) NOT NULL,
+                normalized_url TEXT NOT NULL,
+                etag VARCHAR(255) NULL,
+                last_modified VARCHAR(64) NULL,
+                content_length BIGINT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    ON UPDATE CURRENT_TIMESTAMP,
+                PRIMARY KEY (site_id, url_hash)
+            )
+            """
+        )
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+        DB_SEMAPHORE.release()
+
+
+def upsert_page_validators(*, site_id, normalized_url, etag, last_modified, content_length):
+    write_row("page_validators", {
+        "site_id": site_id,
+        "url_hash": validators_url_hash(normalized_url),
+        "normalized_url": normalized_url,
+        "etag": etag,
+        "last_modified": last_modified,
+        "content_length": content_length,
+    })
+
+
+def get_site_validators(*, site_id: int) -> dict:
+    """Return {normalized_url: {"etag", "last_modified", "content_length"}}."""
+    conn = get_connection()
+    try:
+        cur = conn.cursor(dictionary=True)
+        cur.execute(
+            """
+            SELECT normalized_url, etag, last_modified, content_length
+            FROM page_validators
+            WHERE site_id=%s
+            """,
+            (site_id,),
+        )
+        return {row.pop("normalized_url"): row for row in cur.fetchall()}
+    finally:
+        cur.close()
+        conn.close()
+        DB_SEMAPHORE.release()
+
+
+# ==================================================
+# PER-SITE CACHE (loaded once per COMPARE job)
+# ==================================================
+
+_site_validators = {}
+_lock = threading.Lock()
+
+
+def load_site_validators(site_id: int) -> dict:
+    validators = _site_validators.get(site_id)
+    if validators is not None:
+        return validators
+
+    with _lock:
+        validators = _site_validators.get(site_id)
+        if validators is None:
+            validators = get_site_validators(site_id=site_id)
+            _site_validators[site_id] = validators
+            print(f"[REVALIDATE] Loaded {len(validators)} validator(s) for site {site_id}")
+    return validators
+
+
+def invalidate_site_validators(site_id: int = None):
+    with _lock:
+        if site_id is None:
+            _site_validators.clear()
+        else:
+            _site_validators.pop(site_id, None)
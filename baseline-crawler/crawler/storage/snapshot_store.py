@@ -0,0 +1,234 @@
+# crawler/storage/snapshot_store.py
+"""
+Content-addressed baseline snapshot store.
+
+Layout per site:
+
+    baselines/<custid>/<siteid>/objects/<ab>/<object_key>.html.<codec>
+    baselines/<custid>/<siteid>/refs.log   (baseline_id <TAB> object_key <TAB> codec)
+
+object_key is the sha256 of the stored HTML bytes, so one compressed
+blob is written per unique snapshot and byte-identical pages share
+storage. (Keying on the normalized-content hash would hand one page's
+raw HTML back for every page that normalizes the same.) Refs written
+by older runs keyed on that hash still resolve: a ref just names a blob.
+Snapshots written before this store existed (<baseline_id>.html) are
+still readable.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+from crawler.config import SNAPSHOT_CODEC
+
+REFS_FILE = "refs.log"
+OBJECTS_DIR = "objects"
+
+
+def _codec() -> str:
+    if SNAPSHOT_CODEC == "zstd" and zstandard is None:
+        return "gz"
+    return SNAPSHOT_CODEC
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    if codec == "gz":
+        return gzip.compress(data, compresslevel=6)
+    return data
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read .zst snapshots")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "gz":
+        return gzip.decompress(data)
+    return data
+
+
+def _blob_path(site_dir: Path, object_key: str, codec: str) -> Path:
+    suffix = "zst" if codec == "zstd" else codec
+    return site_dir / OBJECTS_DIR / object_key[:2] / f"{object_key}.html.{suffix}"
+
+
+# ==================================================
+# PER-SITE REF MAP (baseline_id -> object_key)
+# ==================================================
+
+class _SiteRefs:
+    def __init__(self, site_dir: Path):
+        self.site_dir = site_dir
+        self.path = site_dir / REFS_FILE
+        self.lock = threading.Lock()
+        self.refs = {}
+        self._size = 0
+
+    def _reload_if_changed(self):
+        # Another process (or an earlier run) may have appended refs
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return
+        if size == self._size:
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            f.seek(self._size)
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) == 3:
+                    self.refs[parts[0]] = (parts[1], parts[2])
+            self._size = f.tell()
+
+    def get(self, baseline_id: str):
+        with self.lock:
+            if baseline_id not in self.refs:
+                self._reload_if_changed()
+            return self.refs.get(baseline_id)
+
+    def max_seq(self, prefix: str) -> int:
+        """Highest N among refs named ``<prefix>N`` (0 if none)."""
+        with self.lock:
+            self._reload_if_changed()
+            max_seq = 0
+            for baseline_id in self.refs:
+                if baseline_id.startswith(prefix):
+                    try:
+                        max_seq = max(max_seq, int(baseline_id[len(prefix):]))
+                    except ValueError:
+                        pass
+            return max_seq
+
+    def add(self, baseline_id: str, object_key: str, codec: str):
+        with self.lock:
+            # An id maps to one snapshot forever: never repoint it
+            self._reload_if_changed()
+            if baseline_id in self.refs:
+                raise ValueError(f"baseline_id {baseline_id} is already stored in {self.path}")
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(f"{baseline_id}\t{object_key}\t{codec}\n")
+            self.refs[baseline_id] = (object_key, codec)
+            # Read forward from the last offset: picks up refs left by
+            # earlier runs (or other processes) as well as our own line,
+            # so _size always ends on a line boundary
+            self._reload_if_changed()
+
+
+_sites = {}
+_sites_lock = threading.Lock()
+
+
+def _site_refs(site_dir: Path) -> _SiteRefs:
+    key = str(site_dir.resolve())
+    refs = _sites.get(key)
+    if refs is None:
+        with _sites_lock:
+            refs = _sites.get(key)
+            if refs is None:
+                refs = _SiteRefs(site_dir)
+                _sites[key] = refs
+    return refs
+
+
+# ==================================================
+# STATS
+# ==================================================
+
+STORE_STATS = {"blobs_written": 0, "dedup_hits": 0, "bytes_raw": 0, "bytes_stored": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(**deltas):
+    with _stats_lock:
+        for k, v in deltas.items():
+            STORE_STATS[k] += v
+
+
+# ==================================================
+# PUBLIC API
+# ==================================================
+
+def max_snapshot_seq(*, site_dir: Path, siteid: int) -> int:
+    """Highest sequence among the site's stored ``<siteid>-N`` baseline ids."""
+    return _site_refs(site_dir).max_seq(f"{siteid}-")
+
+
+def write_snapshot(*, site_dir: Path, baseline_id: str, html: str) -> Path:
+    """
+    Store ``html`` under the hash of its bytes and record the baseline_id
+    ref. Raises ValueError if ``baseline_id`` already names a snapshot.
+    """
+    codec = _codec()
+    raw = html.encode("utf-8")
+    object_key = hashlib.sha256(raw).hexdigest()
+    blob = _blob_path(site_dir, object_key, codec)
+
+    if blob.exists():
+        _count(dedup_hits=1, bytes_raw=len(raw))
+    else:
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        data = _compress(raw, codec)
+        tmp = blob.with_name(f"{blob.name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, blob)
+        _count(blobs_written=1, bytes_raw=len(raw), bytes_stored=len(data))
+
+    _site_refs(site_dir).add(baseline_id, object_key, codec)
+    return blob
+
+
+def read_snapshot(*, site_dir: Path, baseline_id: str):
+    """Return the stored HTML for ``baseline_id``, or None if missing."""
+    ref = _site_refs(site_dir).get(baseline_id)
+    if ref is not None:
+        object_key, codec = ref
+        blob = _blob_path(site_dir, object_key, codec)
+        if blob.exists():
+            return _decompress(blob.read_bytes(), codec).decode("utf-8", errors="ignore")
+
+    # Legacy uncompressed snapshot
+    legacy = site_dir / f"{baseline_id}.html"
+    if legacy.exists():
+        return legacy.read_text(encoding="utf-8", errors="ignore")
+
+    return None
+
+
+
+# ==================================================
+# FINGERPRINTS (keyed by content hash, next to blobs)
+# ==================================================
+
+def _fingerprint_path(site_dir: Path, content_hash: str) -> Path:
+    return site_dir / OBJECTS_DIR / content_hash[:2] / f"{content_hash}.fp.json"
+
+
+def has_fingerprint(*, site_dir: Path, content_hash: str) -> bool:
+    return _fingerprint_path(site_dir, content_hash).exists()
+
+
+def write_fingerprint(*, site_dir: Path, content_hash: str, fingerprint: dict):
+    path = _fingerprint_path(site_dir, content_hash)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(fingerprint, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def read_fingerprint(*, site_dir: Path, content_hash: str):
+    """Return the stored fingerprint dict, or None if not computed yet."""
+    try:
+        return json.loads(_fingerprint_path(site_dir, content_hash).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
@@ -0,0 +1,114 @@
+# crawler/storage/statements.py
+"""
+SQL for the per-page rows.
+
+The single-row helpers below (used when a job has no DBWriter) and the
+write-behind writer's batches (crawler/storage/write_behind.py) both
+take their statement from STATEMENTS, so a change here reaches every
+write path at once.
+"""
+
+from crawler.storage.mysql import get_connection
+from crawler.storage.db_guard import DB_SEMAPHORE
+
+CRAWL_PAGE_COLUMNS = (
+    "job_id", "custid", "siteid", "url", "parent_url", "depth", "status_code",
+    "content_type", "content_length", "response_time_ms", "fetched_at",
+)
+INSERT_CRAWL_PAGE_SQL = """
+    INSERT INTO crawl_pages
+        (job_id, custid, siteid, url, parent_url, depth, status_code,
+         content_type, content_length, response_time_ms, fetched_at)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+OBSERVED_PAGE_COLUMNS = (
+    "site_id", "baseline_id", "normalized_url", "observed_hash", "changed",
+    "diff_path", "defacement_score", "defacement_severity",
+)
+INSERT_OBSERVED_PAGE_SQL = """
+    INSERT INTO observed_pages
+        (site_id, baseline_id, normalized_url, observed_hash, changed,
+         diff_path, defacement_score, defacement_severity)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+DEFACEMENT_SITE_COLUMNS = ("siteid", "baseline_id", "url")
+INSERT_DEFACEMENT_SITE_SQL = """
+    INSERT INTO defacement_sites (siteid, baseline_id, url)
+    VALUES (%s, %s, %s)
+"""
+
+BASELINE_HASH_COLUMNS = ("site_id", "normalized_url", "content_hash", "baseline_path")
+UPSERT_BASELINE_HASH_SQL = """
+    INSERT INTO baseline_pages (site_id, normalized_url, content_hash, baseline_path)
+    VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        content_hash=VALUES(content_hash),
+        baseline_path=VALUES(baseline_path)
+"""
+
+PAGE_VALIDATORS_COLUMNS = (
+    "site_id", "url_hash", "normalized_url", "etag", "last_modified", "content_length",
+)
+UPSERT_PAGE_VALIDATORS_SQL = """
+    INSERT INTO page_validators
+        (site_id, url_hash, normalized_url, etag, last_modified, content_length)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        normalized_url=VALUES(normalized_url),
+        etag=VALUES(etag),
+        last_modified=VALUES(last_modified),
+        content_length=VALUES(content_length)
+"""
+
+# kind -> (SQL, column order of its parameters)
+STATEMENTS = {
+    "crawl_page": (INSERT_CRAWL_PAGE_SQL, CRAWL_PAGE_COLUMNS),
+    "observed_page": (INSERT_OBSERVED_PAGE_SQL, OBSERVED_PAGE_COLUMNS),
+    "defacement_site": (INSERT_DEFACEMENT_SITE_SQL, DEFACEMENT_SITE_COLUMNS),
+    "baseline_hash": (UPSERT_BASELINE_HASH_SQL, BASELINE_HASH_COLUMNS),
+    "page_validators": (UPSERT_PAGE_VALIDATORS_SQL, PAGE_VALIDATORS_COLUMNS),
+}
+
+
+def statement_params(kind: str, fields: dict) -> tuple:
+    """Parameters for ``kind``'s statement, in column order."""
+    _sql, columns = STATEMENTS[kind]
+    unknown = set(fields) - set(columns)
+    if unknown:
+        raise ValueError(f"Unknown {kind} column(s): {', '.join(sorted(unknown))}")
+    return tuple(fields.get(c) for c in columns)
+
+
+def write_row(kind: str, fields: dict):
+    """Write one ``kind`` row now (the path used without a DBWriter)."""
+    sql, _columns = STATEMENTS[kind]
+    params = statement_params(kind, fields)
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+        DB_SEMAPHORE.release()
+
+
+# ---------------- single-row helpers ----------------
+
+def insert_crawl_page(record: dict):
+    write_row("crawl_page", record)
+
+
+def insert_observed_page(**fields):
+    write_row("observed_page", fields)
+
+
+def insert_defacement_site(**fields):
+    write_row("defacement_site", fields)
+
+
+def upsert_baseline_hash(**fields):
+    write_row("baseline_hash", fields)
@@ -0,0 +1,193 @@
+# crawler/storage/write_behind.py
+"""
+Write-behind pipeline for per-page DB writes.
+
+Crawl threads push rows onto a bounded queue and move on; one writer
+thread per job flushes them with multi-row executemany() once a batch
+fills up or DB_WRITE_FLUSH_SECONDS pass. close() drains everything and
+reports failures so the job result can surface them.
+"""
+
+import queue
+import threading
+import time
+
+from crawler.storage.mysql import get_connection
+from crawler.storage.db_guard import DB_SEMAPHORE
+from crawler.storage.page_validators import validators_url_hash
+from crawler.storage.statements import STATEMENTS, statement_params
+from crawler.config import (
+    DB_WRITE_BATCH_SIZE,
+    DB_WRITE_FLUSH_SECONDS,
+    DB_WRITE_QUEUE_SIZE,
+)
+
+_FLUSH = object()
+_CLOSE = object()
+
+
+class _Sync:
+    """Flush request that the caller waits on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+MAX_ERRORS_KEPT = 20
+
+
+class DBWriter(threading.Thread):
+    def __init__(self, name="DBWriter", metrics=None):
+        super().__init__(name=name, daemon=True)
+        self.metrics = metrics
+        self.queue = queue.Queue(maxsize=DB_WRITE_QUEUE_SIZE)
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.errors = []
+        self._closed = False
+        self.start()
+
+    # ---------------- PRODUCER API ----------------
+
+    def crawl_page(self, record: dict):
+        self._put("crawl_page", record)
+
+    def observed_page(self, **fields):
+        self._put("observed_page", fields)
+
+    def defacement_site(self, **fields):
+        self._put("defacement_site", fields)
+
+    def baseline_hash(self, **fields):
+        self._put("baseline_hash", fields)
+
+    def page_validators(self, **fields):
+        fields["url_hash"] = validators_url_hash(fields["normalized_url"])
+        self._put("page_validators", fields)
+
+    def _put(self, kind, fields):
+        if self._closed:
+            raise RuntimeError(f"{self.name} is closed")
+        # Same statement (crawler/storage/statements.py) as a single-row write
+        self.queue.put((kind, statement_params(kind, fields)))
+
+    # ---------------- WRITER THREAD ----------------
+
+    def run(self):
+        pending = {}   # kind -> rows
+        count = 0
+        deadline = time.monotonic() + DB_WRITE_FLUSH_SECONDS
+
+        while True:
+            timeout = max(deadline - time.monotonic(), 0)
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = _FLUSH
+
+            if isinstance(item, _Sync):
+                self._flush(pending)
+                count = 0
+                deadline = time.monotonic() + DB_WRITE_FLUSH_SECONDS
+                item.done.set()
+                continue
+
+            if item is _FLUSH or item is _CLOSE:
+                self._flush(pending)
+                count = 0
+                deadline = time.monotonic() + DB_WRITE_FLUSH_SECONDS
+                if item is _CLOSE:
+                    return
+                continue
+
+            kind, row = item
+            pending.setdefault(kind, []).append(row)
+            count += 1
+            if count >= DB_WRITE_BATCH_SIZE:
+                self._flush(pending)
+                count = 0
+                deadline = time.monotonic() + DB_WRITE_FLUSH_SECONDS
+
+    def _flush(self, pending):
+        for kind, rows in pending.items():
+            if rows:
+                self._write(kind, rows)
+                rows.clear()
+
+    def _write(self, kind, rows):
+        sql, _columns = STATEMENTS[kind]
+        started = time.perf_counter()
+        try:
+            self._execute(sql, rows, many=True)
+            self.written += len(rows)
+            self.batches += 1
+            if self.metrics is not None:
+                self.metrics.observe("db_write", time.perf_counter() - started)
+                self.metrics.incr("db_rows", len(rows))
+            return
+        except Exception as e:
+            print(f"[{self.name}] Batch of {len(rows)} {kind} row(s) failed: {e}; retrying row by row")
+
+        # Isolate the bad rows so one of them doesn't sink the whole batch
+        for row in rows:
+            try:
+                self._execute(sql, row, many=False)
+                self.written += 1
+            except Exception as e:
+                self.failed += 1
+                if self.metrics is not None:
+                    self.metrics.incr("db_rows_failed")
+                if len(self.errors) < MAX_ERRORS_KEPT:
+                    self.errors.append(f"{kind}: {e}")
+
+    def _execute(self, sql, params, *, many):
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            if many:
+                cur.executemany(sql, params)
+            else:
+                cur.execute(sql, params)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+            conn.close()
+            DB_SEMAPHORE.release()
+
+    # ---------------- LIFECYCLE ----------------
+
+    def flush(self):
+        """Ask the writer to flush now (non-blocking)."""
+        self.queue.put(_FLUSH)
+
+    def sync(self) -> int:
+        """
+        Write every row queued so far, then return the total number of
+        rows that failed in this writer's lifetime.
+        """
+        if not self._closed:
+            request = _Sync()
+            self.queue.put(request)
+            # A close() racing this call may stop the thread first
+            while not request.done.wait(0.5) and self.is_alive():
+                pass
+        else:
+            # close() drains everything before the thread exits
+            self.join()
+        return self.failed
+
+    def close(self) -> dict:
+        """Drain, flush and stop. Always call at job end."""
+        if not self._closed:
+            self._closed = True
+            self.queue.put(_CLOSE)
+            self.join()
+        return {
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+            "errors": list(self.errors),
+        }
@@ -0,0 +1,185 @@
+"""
+Canonicalize and de-duplicate extracted links before they reach the frontier.
+
+Rules (configurable in crawler/config.py):
+  FRAGMENT          strip "#..." (never sent to the server)
+  ELEMENTOR_ACTION  same, counted separately for Elementor's
+                    "#elementor-action:..." popup/off-canvas links
+  TRACKING_PARAM    drop query params matching URL_CANON_DROP_PARAMS
+  QUERY_ORDER       sort the remaining query params
+  <name>            drop the whole URL if it matches a pattern in
+                    URL_CANON_DROP_URL_PATTERNS, or a pattern in
+                    URL_CANON_ALIAS_PATTERNS once a crawled page named
+                    that URL as its <link rel="shortlink"> (a CMS alias
+                    of a page already reachable under its permalink)
+
+Rewritten queries keep each remaining pair exactly as it was encoded.
+
+Per-rule counters record how many URLs each rule eliminated, i.e. how
+many links collapsed into a URL the job had already produced.
+"""
+
+import re
+import threading
+from collections import Counter
+from urllib.parse import urljoin, urlsplit, urlunsplit, unquote_plus
+
+from crawler.config import (
+    URL_CANON_DROP_PARAMS,
+    URL_CANON_SORT_QUERY,
+    URL_CANON_DROP_URL_PATTERNS,
+    URL_CANON_ALIAS_PATTERNS,
+)
+from crawler.visited_set import URLHashSet, url_key
+
+DUPLICATE = "DUPLICATE"
+
+_SHORTLINK_TAG = re.compile(r"<link\b[^>]*\brel=[\"']?shortlink\b[^>]*>", re.IGNORECASE)
+_HREF = re.compile(r"\bhref=(?:\"([^\"]*)\"|'([^']*)'|([^\s>]+))", re.IGNORECASE)
+
+
+def _alias_key(url: str) -> int:
+    # Scheme and "www." don't make a different alias
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return url_key(f"{host}{parts.path}?{parts.query}")
+
+
+def _pair_key(pair: str):
+    name, _, value = pair.partition("=")
+    return unquote_plus(name), unquote_plus(value)
+
+
+class URLCanonicalizer:
+    def __init__(
+        self,
+        *,
+        drop_params=URL_CANON_DROP_PARAMS,
+        sort_query=URL_CANON_SORT_QUERY,
+        drop_url_patterns=URL_CANON_DROP_URL_PATTERNS,
+        alias_patterns=URL_CANON_ALIAS_PATTERNS,
+    ):
+        self._drop_param = (
+            re.compile("|".join(f"(?:{p})" for p in drop_params), re.IGNORECASE)
+            if drop_params else None
+        )
+        self._sort_query = sort_query
+        self._drop_urls = [(name, re.compile(p)) for name, p in drop_url_patterns.items()]
+        self._aliases = [(name, re.compile(p)) for name, p in alias_patterns.items()]
+
+        self._lock = threading.Lock()
+        self._seen = URLHashSet()    # 64-bit keys of canonical URLs produced this job
+        self._known_aliases = URLHashSet()  # aliases announced by a crawled page
+        self.eliminated = Counter()  # rule -> URLs that collapsed into a seen URL
+        self.dropped = Counter()     # rule -> URLs dropped outright
+
+    def canonicalize(self, url: str):
+        """Returns (canonical_url or None if dropped, [rules applied])."""
+        for name, pattern in self._drop_urls:
+            if pattern.search(url):
+                return None, [name]
+
+        applied = []
+        parts = urlsplit(url)
+        fragment = parts.fragment
+        if fragment:
+            applied.append("ELEMENTOR_ACTION" if fragment.startswith("elementor-action") else "FRAGMENT")
+
+        query = parts.query
+        if query:
+            # Raw "name=value" pairs, compared decoded, re-joined as sent
+            params = [p for p in query.split("&") if p]
+            rewritten = params
+            if self._drop_param is not None:
+                kept = [p for p in rewritten if not self._drop_param.match(_pair_key(p)[0])]
+                if len(kept) != len(rewritten):
+                    applied.append("TRACKING_PARAM")
+                rewritten = kept
+            if self._sort_query:
+                ordered = sorted(rewritten, key=_pair_key)
+                if ordered != rewritten:
+                    applied.append("QUERY_ORDER")
+                rewritten = ordered
+            # Rebuild only when a rule changed the params
+            if rewritten is not params:
+                query = "&".join(rewritten)
+
+        if not applied:
+            return url, applied
+        return urlunsplit((parts.scheme, parts.netloc, parts.path, query, "")), applied
+
+    def apply(self, urls):
+        """Canonical, de-duplicated version of one page's extracted links."""
+        out = []
+        page_seen = set()
+        eliminated = Counter()
+        dropped = Counter()
+
+        results = [(u, *self.canonicalize(u)) for u in urls]
+
+        with self._lock:
+            for u, canon, applied in results:
+                if canon is not None and self._known_aliases:
+                    alias = self._alias_rule(canon)
+                    if alias is not None:
+                        canon, applied = None, [alias]
+                if canon is None:
+                    dropped[applied[0]] += 1
+                    continue
+
+                if not self._seen.add_key(url_key(canon)):
+                    # Already produced by this job: credit the rules that made it collapse
+                    if canon != u:
+                        for rule in applied:
+                            eliminated[rule] += 1
+                    else:
+                        eliminated[DUPLICATE] += 1
+
+                # The frontier does cross-page dedup; only collapse within this page
+                if canon not in page_seen:
+                    page_seen.add(canon)
+                    out.append(canon)
+
+            self.eliminated.update(eliminated)
+            self.dropped.update(dropped)
+
+        return out
+
+    def _alias_rule(self, url: str):
+        """Alias rule dropping ``url`` (its permalink page was seen), or None."""
+        for name, pattern in self._aliases:
+            if pattern.search(url) and self._known_aliases.has_key(_alias_key(url)):
+                return name
+        return None
+
+    def note_aliases(self, html: str, page_url: str):
+        """Record the <link rel="shortlink"> a crawled page announces for itself."""
+        if not self._aliases:
+            return
+        head_end = html.find("</head>")
+        head = html if head_end < 0 else html[:head_end]
+        keys = []
+        for tag in _SHORTLINK_TAG.findall(head):
+            m = _HREF.search(tag)
+            if m:
+                href = next(g for g in m.groups() if g is not None)
+                canon, _applied = self.canonicalize(urljoin(page_url, href.strip()))
+                if canon is not None:
+                    keys.append(_alias_key(canon))
+        if keys:
+            with self._lock:
+                for key in keys:
+                    self._known_aliases.add_key(key)
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "eliminated": dict(self.eliminated),
+                "dropped": dict(self.dropped),
+                "unique_urls": len(self._seen),
+            }
+
+    def memory_bytes(self) -> int:
+        return self._seen.memory_bytes() + self._known_aliases.memory_bytes()
@@ -0,0 +1,157 @@
+"""
+Per-job URL filter for extracted links.
+
+Built once per crawl job: the seed host is parsed once, path rules are
+compiled once, and each candidate URL is parsed exactly once. Decisions
+are memoized (bounded, cleared when full) because navigation links
+repeat on every page of a site.
+"""
+
+import re
+import threading
+from collections import Counter
+from urllib.parse import urlsplit
+
+from crawler.config import (
+    ALLOWED_DOMAINS,
+    SITE_PATH_BLOCK_RULES,
+    BLOCK_REPORT_SAMPLE_SIZE,
+)
+
+PATH_BLOCK_RULES = {
+    "TAG_PAGE": r"^/tag/",
+    "AUTHOR_PAGE": r"^/author/",
+    "PAGINATION": r"/page/\d*/?$",
+}
+
+STATIC_EXTENSIONS = (
+    ".css", ".js", ".png", ".jpg", ".jpeg",
+    ".gif", ".svg", ".ico", ".pdf", ".zip"
+)
+
+# Block reasons returned by URLFilter.check()
+BLOCK_RULE = "BLOCK_RULE"
+DOMAIN_FILTER = "DOMAIN_FILTER"
+
+CACHE_LIMIT = 50_000
+
+
+def _host(netloc: str) -> str:
+    return netloc.lower().split(":")[0]
+
+
+def compile_path_rules(rules: dict):
+    """[(rule name, compiled pattern)] in rule order."""
+    # Compiled one by one: a rule may contain its own (named) groups
+    return [(name, re.compile(pattern)) for name, pattern in rules.items()]
+
+
+class URLFilter:
+    def __init__(self, seed_url: str, *, siteid=None, path_rules: dict = None, allowed_domains=None):
+        if path_rules is None:
+            path_rules = dict(PATH_BLOCK_RULES)
+            path_rules.update(SITE_PATH_BLOCK_RULES.get(siteid, {}))
+        self.path_rules = path_rules
+        self._path_rules = compile_path_rules(path_rules)
+
+        seed_host = _host(urlsplit(seed_url).netloc)
+        base = seed_host[4:] if seed_host.startswith("www.") else seed_host
+        self.allowed_hosts = {base, f"www.{base}"}
+        self.allowed_hosts.update(
+            d.lower() for d in (ALLOWED_DOMAINS if allowed_domains is None else allowed_domains)
+        )
+
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+
+    def classify_path(self, path: str):
+        """Rule name that blocks ``path`` ("STATIC" for assets), or None."""
+        if path.endswith(STATIC_EXTENSIONS):
+            return "STATIC"
+        path = path.lower()
+        for name, pattern in self._path_rules:
+            if pattern.search(path):
+                return name
+        return None
+
+    def check(self, url: str):
+        """
+        Returns (reason, rule): (None, None) if the URL may be enqueued,
+        (BLOCK_RULE, <rule name>) or (DOMAIN_FILTER, None) otherwise.
+        """
+        hit = self._cache.get(url)
+        if hit is not None:
+            return hit
+
+        parts = urlsplit(url)
+        rule = self.classify_path(parts.path)
+        if rule:
+            result = (BLOCK_RULE, rule)
+        elif _host(parts.netloc) not in self.allowed_hosts:
+            result = (DOMAIN_FILTER, None)
+        else:
+            result = (None, None)
+
+        # Shared by the job's worker threads
+        with self._cache_lock:
+            if len(self._cache) >= CACHE_LIMIT:
+                self._cache.clear()
+            self._cache[url] = result
+        return result
+
+
+class BlockReport:
+    """
+    Bounded record of blocked links: a counter per (reason, rule) plus a
+    small sample of distinct URLs per reason, instead of every URL string.
+    """
+
+    def __init__(self, sample_size=BLOCK_REPORT_SAMPLE_SIZE):
+        self.sample_size = sample_size
+        self.counts = Counter()
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, reason, rule, url):
+        with self._lock:
+            self.counts[(reason, rule)] += 1
+            sample = self.samples.setdefault(reason, [])
+            if len(sample) < self.sample_size and url not in sample:
+                sample.append(url)
+
+    def merge(self, other):
+        with other._lock:
+            counts = Counter(other.counts)
+            samples = {r: list(s) for r, s in other.samples.items()}
+        with self._lock:
+            self.counts.update(counts)
+            for reason, urls in samples.items():
+                sample = self.samples.setdefault(reason, [])
+                for u in urls:
+                    if len(sample) >= self.sample_size:
+                        break
+                    if u not in sample:
+                        sample.append(u)
+
+    def totals(self) -> dict:
+        """reason -> blocked links (duplicates included)."""
+        out = Counter()
+        with self._lock:
+            for (reason, _rule), n in self.counts.items():
+                out[reason] += n
+        return dict(out)
+
+    def memory_bytes(self) -> int:
+        with self._lock:
+            return 100 * len(self.counts) + sum(len(u) + 49 for s in self.samples.values() for u in s)
+
+    def __bool__(self):
+        return bool(self.counts)
+
+
+_default_filter = URLFilter("", path_rules=PATH_BLOCK_RULES)
+
+
+def classify_block(url: str):
+    """Rule name blocking ``url``, or None (domain not considered)."""
+    return _default_filter.classify_path(urlsplit(url).path)
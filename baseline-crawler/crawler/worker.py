@@ -1,9 +1,6 @@
 # crawler/worker.py
 import threading
 import time
-import re
-from collections import defaultdict
-from urllib.parse import urlparse
 from datetime import datetime, timezone
 
 from crawler.fetcher import fetch
@@ -12,64 +9,334 @@ from crawler.normalizer import (
     normalize_rendered_html,
     normalize_url,
 )
-from crawler.storage.db import insert_crawl_page
+from crawler.storage.statements import insert_crawl_page
 from crawler.storage.baseline_store import (
     store_snapshot_file,
     store_baseline_hash,
 )
+from crawler.storage.page_validators import (
+    load_site_validators,
+    upsert_page_validators,
+)
 from crawler.compare_engine import CompareEngine
+from crawler.page_digest import page_content_hash
+from crawler.metrics import metrics_for
+from crawler.revalidate import conditional_fetch, extract_validators
+from crawler.scheduler import host_slot
+from crawler.url_canon import URLCanonicalizer
+from crawler.url_filter import (
+    PATH_BLOCK_RULES,
+    STATIC_EXTENSIONS,
+    BlockReport,
+    URLFilter,
+    classify_block,
+)
 
-from crawler.js_detect import needs_js_rendering
+from crawler.render_advisor import RenderAdvisor
 
 from crawler.render_cache import get_cached_render, set_cached_render
-from crawler.js_render_worker import JSRenderWorker
-JS_RENDERER = JSRenderWorker()
+from crawler.js_render_worker import JSRenderPool
+JS_RENDERER = JSRenderPool()
 
 
 # ==================================================
 # BLOCK RULES
 # ==================================================
 
-PATH_BLOCK_RULES = {
-    "TAG_PAGE": r"^/tag/",
-    "AUTHOR_PAGE": r"^/author/",
-    "PAGINATION": r"/page/\d*/?$",
-}
+# Rules and the compiled per-job filter live in crawler/url_filter.py
 
-STATIC_EXTENSIONS = (
-    ".css", ".js", ".png", ".jpg", ".jpeg",
-    ".gif", ".svg", ".ico", ".pdf", ".zip"
-)
+# Process-wide totals; each job records into its own BlockReport and
+# main.py merges it in at job end
+BLOCK_REPORT = BlockReport()
 
-BLOCK_REPORT = defaultdict(list)
-BLOCK_LOCK = threading.Lock()
 
+# ==================================================
+# WORKER
+# ==================================================
 
-def classify_block(url: str):
-    parsed = urlparse(url)
-    if parsed.path.endswith(STATIC_EXTENSIONS):
-        return "STATIC"
-    for k, r in PATH_BLOCK_RULES.items():
-        if re.search(r, parsed.path.lower()):
-            return k
-    return None
+# Blocking dequeue (crawler/frontier_wait.py): idle workers sleep in
+# frontier.dequeue(timeout) and wake the moment a URL is enqueued. Stop
+# is an event plus frontier.wake(); the timeout is only a backstop.
+IDLE_TIMEOUT = 1.0
 
 
-# ==================================================
-# STRICT DOMAIN FILTER
-# ==================================================
+def shutdown_workers(frontier, workers):
+    """Stop and join workers after frontier.queue.join() returned."""
+    for w in workers:
+        w._stop_event.set()
+    # Blocked workers wake, see their event and exit
+    frontier.wake()
+    for w in workers:
+        w.join()
 
-def _allowed_domain(seed_url: str, candidate_url: str) -> bool:
-    seed_netloc = urlparse(seed_url).netloc.lower().split(":")[0]
-    cand_netloc = urlparse(candidate_url).netloc.lower().split(":")[0]
 
-    base = seed_netloc[4:] if seed_netloc.startswith("www.") else seed_netloc
-    return cand_netloc == base or cand_netloc == f"www.{base}"
+class PageHandler:
+    """
+    Everything that happens to a page after it has been fetched.
 
+    Shared by the threaded Worker and the async engine so both crawl
+    modes behave identically regardless of how the fetch was made.
+    """
+
+    def __init__(
+        self,
+        *,
+        frontier,
+        name,
+        custid,
+        siteid,
+        job_id,
+        crawl_mode,
+        seed_url,
+        writer=None,
+        url_filter=None,
+        canonicalizer=None,
+        block_report=None,
+        discover=True,
+        render_advisor=None,
+    ):
+        self.frontier = frontier
+        self.writer = writer
+        self.url_filter = url_filter or URLFilter(seed_url, siteid=siteid)
+        self.canonicalizer = canonicalizer or URLCanonicalizer()
+        self.block_report = block_report if block_report is not None else BlockReport()
+        self.render_advisor = render_advisor or RenderAdvisor(siteid, crawl_mode, directory=None)
+        self.name = name
+        self.custid = custid
+        self.siteid = siteid
+        self.job_id = job_id
+        self.crawl_mode = crawl_mode
+        self.seed_url = seed_url
+        # False for targeted COMPARE: fetch the given URLs, follow no links
+        self.discover = discover
+        self.metrics = metrics_for(job_id)
+
+        self.compare_engine = (
+            CompareEngine(custid=self.custid, writer=writer, job_id=job_id)
+            if crawl_mode == "COMPARE"
+            else None
+        )
+
+    def validators_for(self, url):
+        """
+        COMPARE: baseline validators for a conditional fetch, or None.
+
+        Only compared pages revalidate: a 304 is answered from their
+        baseline snapshot, which other pages don't have, so they would
+        yield no links.
+        """
+        if self.crawl_mode != "COMPARE":
+            return None
+        if self.compare_engine.monitored_url(url) is None:
+            return None
+        return load_site_validators(self.siteid).get(normalize_url(url))
+
+    def handle(self, *, url, parent, depth, result, start, fetched_at):
+        try:
+            self._handle(url, parent, depth, result, start, fetched_at)
+        finally:
+            # Fetch + everything after it, per page
+            self.metrics.observe("page", time.time() - start)
+
+    def _handle(self, url, parent, depth, result, start, fetched_at):
+        m = self.metrics
+        m.incr("pages")
+        if not result["success"]:
+            m.incr("fetch_errors")
+            print(f"[{self.name}] Fetch failed for {url}: {result.get('error', 'unknown')}")
+            return
+
+        resp = result["response"]
+        ct = resp.headers.get("Content-Type", "")
+
+        record_crawl_page = self.writer.crawl_page if self.writer else insert_crawl_page
+        record_crawl_page({
+            "job_id": self.job_id,
+            "custid": self.custid,
+            "siteid": self.siteid,
+            "url": url,
+            "parent_url": parent,
+            "depth": depth,
+            "status_code": resp.status_code,
+            "content_type": ct,
+            "content_length": len(resp.content),
+            "response_time_ms": int((time.time() - start) * 1000),
+            "fetched_at": fetched_at,
+        })
+
+        # ---------------- 304: UNCHANGED ----------------
+        if result.get("not_modified"):
+            m.incr("not_modified")
+            print(f"[{self.name}] Not modified: {url}")
+            # No body: discover links from the identical baseline copy
+            with m.time("compare"):
+                baseline_html = self.compare_engine.handle_not_modified(
+                    siteid=self.siteid,
+                    url=url,
+                )
+            if baseline_html and self.discover:
+                with m.time("extract_urls"):
+                    urls, _ = extract_urls(baseline_html, url)
+                with m.time("enqueue"):
+                    self._enqueue_children(urls, url, depth)
+            return
+
+        if "text/html" not in ct.lower():
+            return
+
+        # ---------------- HTML HANDLING ----------------
+        html = resp.text
+        # Pre-render HTML when this page was just rendered (for the advisor)
+        raw_html = None
+
+        # 🔒 ALWAYS ensure final HTML before extracting URLs
+        if self.render_advisor.should_render(url, html):
+            # COMPARE must see the live page, never an earlier render
+            use_cache = self.crawl_mode != "COMPARE"
+            cached = get_cached_render(url) if use_cache else None
+            if cached:
+                m.incr("render_cache_hits")
+                html = cached
+            else:
+                print(f"[{self.name}] JS rendering {url}")
+                m.incr("renders")
+                raw_html = html
+                html = JS_RENDERER.render(url, metrics=m)
+                if use_cache:
+                    set_cached_render(url, html)
+
+        # 🔒 Extract URLs ONLY after JS handling
+        urls = []
+        if self.discover:
+            with m.time("extract_urls"):
+                urls, _ = extract_urls(html, url)
+                # Shortlinks of this page become droppable aliases
+                self.canonicalizer.note_aliases(html, url)
+
+            if not urls:
+                print(f"[{self.name}] ⚠️  No URLs extracted from {url}")
+                print(f"[{self.name}]    HTML size: {len(html)} bytes")
+                print(f"[{self.name}]    Possible cause: JS-rendered content or minimal links")
+            else:
+                print(f"[{self.name}] Extracted {len(urls)} URLs from {url}")
+
+        # ---------------- CONTENT HASH (once per page) ----------------
+        content_hash = None
+        # COMPARE: only pages with a selected defacement row are hashed
+        canon_url = (
+            self.compare_engine.monitored_url(url) if self.crawl_mode == "COMPARE" else None
+        )
+        if self.crawl_mode == "BASELINE" or canon_url is not None:
+            with m.time("hash"):
+                content_hash = page_content_hash(
+                    html,
+                    job_id=self.job_id,
+                    url=url,
+                    raw_bytes=len(resp.content),
+                )
+
+        if raw_html is not None:
+            # Reuses the rendered page's links and hash from above
+            changed = self._render_changed(
+                url,
+                raw_html,
+                html,
+                rendered_urls=urls if self.discover else None,
+                rendered_hash=content_hash,
+            )
+            self.render_advisor.record(url, changed)
+
+        # ---------------- MODE LOGIC ----------------
+        if self.crawl_mode == "BASELINE":
+            with m.time("store"):
+                self._store_baseline(url, resp, html, content_hash)
+
+        elif self.crawl_mode == "COMPARE":
+            with m.time("compare"):
+                self.compare_engine.handle_page(
+                    siteid=self.siteid,
+                    url=url,
+                    html=html,
+                    observed_hash=content_hash,
+                    canon_url=canon_url,
+                )
+
+        # ---------------- ENQUEUE ----------------
+        if self.discover:
+            with m.time("enqueue"):
+                self._enqueue_children(urls, url, depth)
+
+    def _store_baseline(self, url, resp, html, content_hash):
+        page_validators = extract_validators(resp)
+        if page_validators:
+            record_validators = self.writer.page_validators if self.writer else upsert_page_validators
+            record_validators(
+                site_id=self.siteid,
+                normalized_url=normalize_url(url),
+                **page_validators,
+            )
+
+        baseline_id, content_hash, path = store_snapshot_file(
+            custid=self.custid,
+            siteid=self.siteid,
+            url=url,
+            html=html,
+            crawl_mode="BASELINE",
+            content_hash=content_hash,
+            writer=self.writer,
+        )
+
+        store_baseline_hash(
+            site_id=self.siteid,
+            normalized_url=normalize_url(url),
+            raw_html=html,
+            baseline_path=path,
+            content_hash=content_hash,
+            writer=self.writer,
+        )
+
+    def _render_changed(self, url, raw_html, rendered_html, *,
+                        rendered_urls=None, rendered_hash=None) -> bool:
+        """
+        Did rendering change what the crawl would extract or store?
+
+        Pass the rendered page's links / hash when _handle() already has
+        them; each document is parsed and hashed at most once.
+        """
+        raw_urls, _ = extract_urls(raw_html, url)
+        if rendered_urls is None:
+            rendered_urls, _ = extract_urls(rendered_html, url)
+        if set(raw_urls) != set(rendered_urls):
+            return True
+        if rendered_hash is None:
+            rendered_hash = page_content_hash(rendered_html)
+        return page_content_hash(raw_html) != rendered_hash
+
+    def _enqueue_children(self, urls, url, depth):
+        # Fragments, tracking params, CMS aliases: one URL per real page
+        urls = self.canonicalizer.apply(urls)
+
+        enqueued_count = 0
+        blocked_count = 0
+        for u in urls:
+            reason, rule = self.url_filter.check(u)
+            if reason is not None:
+                blocked_count += 1
+                self.block_report.record(reason, rule, u)
+                if rule:
+                    print(f"[{self.name}] Blocked (rule {rule}): {u}")
+                else:
+                    print(f"[{self.name}] Blocked (domain): {u}")
+                continue
+
+            self.frontier.enqueue(u, url, depth + 1)
+            enqueued_count += 1
+
+        self.metrics.incr("links_enqueued", enqueued_count)
+        self.metrics.incr("links_blocked", blocked_count)
+        if enqueued_count > 0:
+            print(f"[{self.name}] Enqueued {enqueued_count} URLs")
 
-# ==================================================
-# WORKER
-# ==================================================
 
 class Worker(threading.Thread):
     def __init__(
@@ -81,133 +348,85 @@ class Worker(threading.Thread):
         job_id,
         crawl_mode,
         seed_url,
+        load_stats=None,
+        writer=None,
+        url_filter=None,
+        canonicalizer=None,
+        block_report=None,
+        discover=True,
+        render_advisor=None,
     ):
         super().__init__(name=name)
         self.frontier = frontier
-        self.running = True
+        self._stop_event = threading.Event()
         self.custid = custid
         self.siteid = next(iter(siteid_map.values()))
         self.job_id = job_id
         self.crawl_mode = crawl_mode
         self.seed_url = seed_url
-
-        self.compare_engine = (
-            CompareEngine(custid=self.custid)
-            if crawl_mode == "COMPARE"
-            else None
+        self.load_stats = load_stats
+
+        self.handler = PageHandler(
+            frontier=frontier,
+            name=name,
+            custid=custid,
+            siteid=self.siteid,
+            job_id=job_id,
+            crawl_mode=crawl_mode,
+            seed_url=seed_url,
+            writer=writer,
+            url_filter=url_filter,
+            canonicalizer=canonicalizer,
+            block_report=block_report,
+            discover=discover,
+            render_advisor=render_advisor,
         )
+        self.compare_engine = self.handler.compare_engine
 
     def run(self):
         print(f"[{self.name}] started ({self.crawl_mode})")
 
-        while self.running:
-            (item, got_task) = self.frontier.dequeue()
-
+        while not self._stop_event.is_set():
+            item, got_task = self.frontier.dequeue(timeout=IDLE_TIMEOUT)
             if not got_task:
-                time.sleep(0.1)
                 continue
 
             url, parent, depth = item
             start = time.time()
+            if self.load_stats:
+                self.load_stats.task_started()
 
             try:
                 print(f"[{self.name}] Crawling {url}")
 
-                result = fetch(url, parent, depth)
-                fetched_at = datetime.now(timezone.utc)
+                # COMPARE: revalidate against the baseline's validators
+                validators = self.handler.validators_for(url)
 
-                if not result["success"]:
-                    print(f"[{self.name}] Fetch failed for {url}: {result.get('error', 'unknown')}")
-                    continue
-
-                resp = result["response"]
-                ct = resp.headers.get("Content-Type", "")
-
-                insert_crawl_page({
-                    "job_id": self.job_id,
-                    "custid": self.custid,
-                    "siteid": self.siteid,
-                    "url": url,
-                    "parent_url": parent,
-                    "depth": depth,
-                    "status_code": resp.status_code,
-                    "content_type": ct,
-                    "content_length": len(resp.content),
-                    "response_time_ms": int((time.time() - start) * 1000),
-                    "fetched_at": fetched_at,
-                })
-
-                if "text/html" not in ct.lower():
-                    continue
-
-                # ---------------- HTML HANDLING ----------------
-                html = resp.text
-
-                # 🔒 ALWAYS ensure final HTML before extracting URLs
-                if needs_js_rendering(html):
-                    cached = get_cached_render(url)
-                    if cached:
-                        html = cached
+                metrics = self.handler.metrics
+                wait_start = time.perf_counter()
+                with host_slot(url):
+                    fetch_start = time.perf_counter()
+                    metrics.observe("host_slot_wait", fetch_start - wait_start)
+                    if validators:
+                        result = conditional_fetch(url, parent, depth, validators)
                     else:
-                        print(f"[{self.name}] JS rendering {url}")
-                        html = JS_RENDERER.render(url)
-                        set_cached_render(url, html)
-
-
-                # 🔒 Extract URLs ONLY after JS handling
-                urls, _ = extract_urls(html, url)
-
-                if not urls:
-                    print(f"[{self.name}] ⚠️  No URLs extracted from {url}")
-                    print(f"[{self.name}]    HTML size: {len(html)} bytes")
-                    print(f"[{self.name}]    Possible cause: JS-rendered content or minimal links")
-                else:
-                    print(f"[{self.name}] Extracted {len(urls)} URLs from {url}")
-
-                # ---------------- MODE LOGIC ----------------
-                if self.crawl_mode == "BASELINE":
-                    baseline_id, _, path = store_snapshot_file(
-                        custid=self.custid,
-                        siteid=self.siteid,
-                        url=url,
-                        html=html,
-                        crawl_mode="BASELINE",
-                    )
-
-                    store_baseline_hash(
-                        site_id=self.siteid,
-                        normalized_url=normalize_url(url),
-                        raw_html=html,
-                        baseline_path=path,
-                    )
-
-                elif self.crawl_mode == "COMPARE":
-                    self.compare_engine.handle_page(
-                        siteid=self.siteid,
-                        url=url,
-                        html=html,
+                        result = fetch(url, parent, depth)
+                    metrics.observe("fetch", time.perf_counter() - fetch_start)
+                fetched_at = datetime.now(timezone.utc)
+                if self.load_stats:
+                    self.load_stats.record_fetch(
+                        int((time.time() - start) * 1000),
+                        ok=result["success"],
                     )
 
-                # ---------------- ENQUEUE ----------------
-                enqueued_count = 0
-                for u in urls:
-                    if classify_block(u):
-                        with BLOCK_LOCK:
-                            BLOCK_REPORT["BLOCK_RULE"].append(u)
-                        print(f"[{self.name}] Blocked (rule): {u}")
-                        continue
-
-                    if not _allowed_domain(self.seed_url, u):
-                        with BLOCK_LOCK:
-                            BLOCK_REPORT["DOMAIN_FILTER"].append(u)
-                        print(f"[{self.name}] Blocked (domain): {u}")
-                        continue
-
-                    self.frontier.enqueue(u, url, depth + 1)
-                    enqueued_count += 1
-
-                if enqueued_count > 0:
-                    print(f"[{self.name}] Enqueued {enqueued_count} URLs")
+                self.handler.handle(
+                    url=url,
+                    parent=parent,
+                    depth=depth,
+                    result=result,
+                    start=start,
+                    fetched_at=fetched_at,
+                )
 
             except Exception as e:
                 import traceback
@@ -215,7 +434,10 @@ class Worker(threading.Thread):
                 print(f"[{self.name}] Traceback: {traceback.format_exc()}")
 
             finally:
+                if self.load_stats:
+                    self.load_stats.task_finished()
                 self.frontier.mark_visited(url, got_task=got_task)
 
     def stop(self):
-        self.running = False
+        self._stop_event.set()
+        self.frontier.wake()
@@ -12,8 +12,16 @@ import uuid
 import os
 import requests
 
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from crawler.frontier import Frontier
-from crawler.worker import Worker
+from crawler.frontier_wait import WaitingFrontier
+from crawler.frontier_journal import FrontierJournal, PersistentFrontier, journal_path
+from crawler.worker import Worker, shutdown_workers
 from crawler.normalizer import normalize_url
 from crawler.storage.db import (
     check_db_health,
@@ -22,16 +30,52 @@ from crawler.storage.db import (
     complete_crawl_job,
     fail_crawl_job,
 )
+from crawler.storage.snapshot_store import STORE_STATS
+from crawler.storage.write_behind import DBWriter
+from crawler.storage.page_validators import (
+    ensure_validators_table,
+    load_site_validators,
+    invalidate_site_validators,
+)
+from crawler.storage.baseline_reader import (
+    load_baseline_snapshot,
+    invalidate_baseline_snapshot,
+)
 
 from crawler.worker import BLOCK_REPORT
+from crawler.scheduler import WorkerBudget
+from crawler.url_filter import BlockReport, URLFilter
+from crawler.url_canon import URLCanonicalizer
+from crawler.page_digest import pop_page_memory
+from crawler.render_advisor import RenderAdvisor
+from crawler.metrics import metrics_for, pop_metrics
+from crawler.autoscaler import Autoscaler, SiteLoadStats
+from crawler.compare_engine import DEFACEMENT_INDEX, COMPARE_POOL
+from crawler.compare_targets import compare_targets, discovery_due, mark_discovered
+from crawler.async_engine import AsyncCrawlEngine
+from crawler.config import (
+    SITE_CONCURRENCY,
+    GLOBAL_WORKER_BUDGET,
+    MIN_WORKERS,
+    PER_HOST_MAX_INFLIGHT,
+    FRONTIER_RESUME_MAX_AGE,
+)
 #from crawler.compare_engine import DEFACEMENT_REPORT
 
 CRAWL_MODE = os.getenv("CRAWL_MODE", "CRAWL").upper()
 assert CRAWL_MODE in ("BASELINE", "CRAWL", "COMPARE")
 
-INITIAL_WORKERS = 5
-MAX_WORKERS = 20
-SCALE_THRESHOLD = 100
+# Crawl engine: thread-per-worker (default) or the asyncio engine
+CRAWL_ENGINE = os.getenv("CRAWL_ENGINE", "THREADED").upper()
+assert CRAWL_ENGINE in ("THREADED", "ASYNC")
+
+# COMPARE scope: full link-discovering crawl (default) or only the
+# selected defacement_sites URLs, with a periodic full discovery pass
+COMPARE_SCOPE = os.getenv("COMPARE_SCOPE", "FULL").upper()
+assert COMPARE_SCOPE in ("FULL", "TARGETED")
+
+# Checkpoint the frontier to disk and resume interrupted jobs
+FRONTIER_PERSIST = os.getenv("FRONTIER_PERSIST", "0") == "1"
 
 
 # ============================================================
@@ -76,43 +120,55 @@ def resolve_seed_url(raw_url: str) -> str:
 
 
 # ============================================================
-# MAIN
+# PER SITE JOB
 # ============================================================
 
-def main():
-    # ---------------- DB CHECK ----------------
-    if not check_db_health():
-        print("ERROR: MySQL health check failed.")
-        return
-
-    print("MySQL health check passed.")
-
-    sites = fetch_enabled_sites()
-    if not sites:
-        print("No enabled sites found.")
-        return
-
-    print(f"Found {len(sites)} enabled site(s).")
-
-    # ---------------- PER SITE ----------------
-    for site in sites:
-        siteid = site["siteid"]
-        custid = site["custid"]
-
-        # 🔑 Resolve seed FIRST, normalize AFTER
-        resolved_seed = resolve_seed_url(site["url"])
-        start_url = normalize_url(resolved_seed)
-
-        job_id = str(uuid.uuid4())
-
-        print("\n" + "=" * 60)
-        print(f"Starting crawl job {job_id}")
-        print(f"Customer ID : {custid}")
-        print(f"Site ID     : {siteid}")
-        print(f"Seed URL    : {start_url}")
-        print("=" * 60)
-
-        try:
+def crawl_site(site, budget: WorkerBudget) -> dict:
+    siteid = site["siteid"]
+    custid = site["custid"]
+
+    # 🔑 Resolve seed FIRST, normalize AFTER
+    resolved_seed = resolve_seed_url(site["url"])
+    start_url = normalize_url(resolved_seed)
+
+    job_id = str(uuid.uuid4())
+    journal = None
+    resumed = False
+    if FRONTIER_PERSIST:
+        journal = FrontierJournal(
+            journal_path(siteid, CRAWL_MODE),
+            name=f"FrontierJournal-{siteid}",
+        )
+        previous_job = journal.resumable_job(
+            siteid, CRAWL_MODE, FRONTIER_RESUME_MAX_AGE[CRAWL_MODE]
+        )
+        if previous_job:
+            # A recent run of this site/mode was interrupted: continue it
+            job_id = previous_job
+            resumed = True
+        else:
+            journal.set_job_id(job_id, siteid, CRAWL_MODE)
+
+    print("\n" + "=" * 60)
+    print(f"{'Resuming' if resumed else 'Starting'} crawl job {job_id}")
+    print(f"Customer ID : {custid}")
+    print(f"Site ID     : {siteid}")
+    print(f"Seed URL    : {start_url}")
+    print("=" * 60)
+
+    # Shared by every stage of this job; exported when it ends
+    metrics = metrics_for(job_id, labels={"siteid": siteid, "mode": CRAWL_MODE})
+
+    # Wait for worker slots from the global budget before starting; the
+    # async engine runs no worker threads, so it takes none
+    slots = budget.acquire(MIN_WORKERS) if CRAWL_ENGINE != "ASYNC" else 0
+    workers = []
+    autoscaler = None
+    writer = None
+    block_report = None
+    render_advisor = None
+    try:
+        if not resumed:
             insert_crawl_job(
                 job_id=job_id,
                 custid=custid,
@@ -120,62 +176,373 @@ def main():
                 start_url=start_url,
             )
 
-            frontier = Frontier()
+        if CRAWL_MODE == "COMPARE":
+            # One bulk query per job; page lookups stay in memory
+            invalidate_baseline_snapshot(siteid)
+            load_baseline_snapshot(siteid)
+            invalidate_site_validators(siteid)
+            load_site_validators(siteid)
+
+        # Targeted COMPARE: fetch the selected pages only, no link discovery
+        targets = None
+        if CRAWL_MODE == "COMPARE" and COMPARE_SCOPE == "TARGETED":
+            if discovery_due(siteid):
+                print(f"[{siteid}] Discovery pass: full COMPARE crawl this cycle")
+            else:
+                targets = compare_targets(siteid, DEFACEMENT_INDEX)
+                if not targets:
+                    print(f"[{siteid}] No selected defacement rows for this site")
+        discover = targets is None
+
+        # Workers block in frontier.dequeue(timeout) instead of polling
+        frontier = waiting = WaitingFrontier(Frontier())
+        persistent = None
+        if journal is not None:
+            frontier = persistent = PersistentFrontier(frontier, journal)
+            if resumed:
+                pending = frontier.restore()
+                print(
+                    f"[{siteid}] Resumed frontier: {frontier.resumed_visited} visited, "
+                    f"{pending} pending"
+                )
+            journal.start()
+        # Skipped on resume if already crawled
+        if discover:
             frontier.enqueue(start_url, None, 0)
-
-            workers = []
-            start_time = time.time()
-
+        else:
+            for url in targets:
+                frontier.enqueue(url, None, 0)
+
+        # Per-page rows are batched off the crawl threads
+        writer = DBWriter(name=f"DBWriter-{siteid}", metrics=metrics)
+        if journal is not None:
+            journal.set_barrier(_durability_barrier(job_id, writer))
+        # Compiled once per job, shared by every worker
+        url_filter = URLFilter(start_url, siteid=siteid)
+        canonicalizer = URLCanonicalizer()
+        block_report = BlockReport()
+        render_advisor = RenderAdvisor(siteid, CRAWL_MODE)
+
+        start_time = time.time()
+
+        if CRAWL_ENGINE == "ASYNC":
+            engine = AsyncCrawlEngine(
+                frontier=frontier,
+                custid=custid,
+                siteid=siteid,
+                job_id=job_id,
+                crawl_mode=CRAWL_MODE,
+                seed_url=start_url,
+                writer=writer,
+                url_filter=url_filter,
+                canonicalizer=canonicalizer,
+                block_report=block_report,
+                discover=discover,
+                render_advisor=render_advisor,
+            )
+            # Returns once the frontier is drained (queue.join() semantics)
+            engine.run()
+            workers_used = (
+                f"async ({engine.concurrency} concurrent fetches, "
+                f"{PER_HOST_MAX_INFLIGHT} per host)"
+            )
+        else:
             siteid_map = {siteid: siteid}
+            load_stats = SiteLoadStats()
 
-            for i in range(INITIAL_WORKERS):
+            def spawn(i):
                 w = Worker(
                     frontier=frontier,
-                    name=f"Worker-{i}",
+                    name=f"Worker-{siteid}-{i}",
                     custid=custid,
                     siteid_map=siteid_map,
                     job_id=job_id,
                     crawl_mode=CRAWL_MODE,
                     seed_url=start_url,   # 🔒 SINGLE SOURCE OF TRUTH
+                    load_stats=load_stats,
+                    writer=writer,
+                    url_filter=url_filter,
+                    canonicalizer=canonicalizer,
+                    block_report=block_report,
+                    discover=discover,
+                    render_advisor=render_advisor,
                 )
                 w.start()
-                workers.append(w)
-
-            print(f"Started {len(workers)} workers.")
+                return w
+
+            try:
+                for i in range(slots):
+                    workers.append(spawn(i))
+            except Exception:
+                # Slots for workers that never started go back now; the
+                # finally block releases one per started worker
+                budget.release(slots - len(workers))
+                slots = len(workers)
+                for w in workers:
+                    w.stop()
+                raise
+
+            print(f"[{siteid}] Started {len(workers)} workers.")
+
+            autoscaler = Autoscaler(
+                frontier=frontier,
+                budget=budget,
+                stats=load_stats,
+                spawn=spawn,
+                workers=workers,
+                name=f"Autoscaler-{siteid}",
+            )
+            autoscaler.start()
 
             # 🔒 Deterministic completion
             frontier.queue.join()
 
             # ---------------- SHUTDOWN ----------------
-            for w in workers:
-                w.stop()
-            for w in workers:
-                w.join()
-
-            duration = time.time() - start_time
-            stats = frontier.get_stats()
-
+            autoscaler.stop()
+            shutdown_workers(frontier, workers + autoscaler.retired)
+            workers_used = f"{len(workers)} (peak {autoscaler.peak_workers})"
+
+        # 🔒 Every queued row is written before the job is closed
+        if CRAWL_MODE == "COMPARE":
+            # Pages still being scored/diffed in the compare pool
+            COMPARE_POOL.drain(job_id)
+        db_result = writer.close()
+        writer = None
+
+        duration = time.time() - start_time
+        stats = frontier.get_stats()
+
+        if CRAWL_MODE == "COMPARE":
+            invalidate_baseline_snapshot(siteid)
+            invalidate_site_validators(siteid)
+
+        if db_result["failed"]:
+            # Rows were lost: the job must not look complete
+            fail_crawl_job(
+                job_id,
+                f"{db_result['failed']} DB row(s) failed to write; first: "
+                f"{db_result['errors'][0] if db_result['errors'] else 'unknown'}",
+            )
+        else:
             complete_crawl_job(
                 job_id=job_id,
                 pages_crawled=stats["visited_count"],
             )
+        if CRAWL_MODE == "COMPARE" and COMPARE_SCOPE == "TARGETED" and discover:
+            mark_discovered(siteid)
+        if journal is not None:
+            # Finished: nothing left to resume
+            journal.close(completed=True)
+            journal = None
+
+        print("\n" + "-" * 60)
+        print("CRAWL COMPLETED")
+        print("-" * 60)
+        print(f"Job ID            : {job_id}")
+        print(f"Customer ID       : {custid}")
+        print(f"Site ID           : {siteid}")
+        print(f"Seed URL          : {start_url}")
+        print(f"Total URLs visited: {stats['visited_count']}")
+        print(f"Crawl duration    : {duration:.2f} seconds")
+        print(f"Workers used      : {workers_used}")
+        if targets is not None:
+            print(f"Compare scope     : targeted ({len(targets)} selected page(s))")
+        print(
+            f"DB writes         : {db_result['written']} rows in "
+            f"{db_result['batches']} batch(es), {db_result['failed']} failed"
+        )
+        for err in db_result["errors"]:
+            print(f"  DB write error  : {err}")
+        canon = canonicalizer.report()
+        print(f"Unique link URLs  : {canon['unique_urls']}")
+        for rule, n in sorted(canon["eliminated"].items()):
+            print(f"  collapsed [{rule}]: {n}")
+        for rule, n in sorted(canon["dropped"].items()):
+            print(f"  dropped   [{rule}]: {n}")
+        for (reason, rule), n in sorted(block_report.counts.items(), key=lambda kv: -kv[1]):
+            print(f"  blocked   [{rule or reason}]: {n}")
+        print(f"URL state memory  : {_job_memory(waiting, persistent, canonicalizer, block_report)}")
+        render = render_advisor.report()
+        print(f"JS renders        : {render['renders']} rendered, {render['avoided']} avoided")
+        if render["skipped_templates"]:
+            print(f"  render skipped  : {', '.join(render['skipped_templates'])}")
+        page_mem = pop_page_memory(job_id)
+        if page_mem["pages"]:
+            print(
+                f"Page memory       : peak {page_mem['peak_bytes'] / 1024:.1f} KiB "
+                f"({page_mem['peak_url']}), mean {page_mem['mean_bytes'] / 1024:.1f} KiB "
+                f"over {page_mem['pages']} hashed page(s)"
+            )
+        if CRAWL_MODE == "BASELINE":
+            print(
+                f"Snapshot blobs    : {STORE_STATS['blobs_written']} written, "
+                f"{STORE_STATS['dedup_hits']} deduplicated (all sites so far)"
+            )
+        _print_stage_times(metrics)
+        print("-" * 60)
+
+        return {
+            "job_id": job_id,
+            "siteid": siteid,
+            "pages": stats["visited_count"],
+            "duration": duration,
+            "db_write_failures": db_result["failed"],
+        }
+
+    except Exception as e:
+        fail_crawl_job(job_id, str(e))
+        print(f"ERROR: Crawl job {job_id} failed: {e}")
+        raise
+
+    finally:
+        if autoscaler is not None:
+            autoscaler.stop()
+        if writer is not None:
+            # Failed job: still flush what was crawled
+            COMPARE_POOL.drain(job_id)
+            writer.close()
+        if journal is not None:
+            # Keep the checkpoint so the next run resumes this job
+            journal.close()
+        if block_report is not None:
+            # Failed jobs' blocked links count too
+            BLOCK_REPORT.merge(block_report)
+        if render_advisor is not None:
+            # Keep what this job learned even if it failed
+            try:
+                render_advisor.save()
+            except OSError as e:
+                print(f"[{siteid}] Saving render decisions failed: {e}")
+        # Autoscaler already returned the slots of workers it retired
+        budget.release(len(workers) if workers else slots)
+        pop_metrics(job_id)
+        if render_advisor is not None:
+            metrics.incr("renders_avoided", render_advisor.report()["avoided"])
+        try:
+            for path in metrics.export():
+                print(f"[{siteid}] Metrics written: {path}")
+        except OSError as e:
+            print(f"[{siteid}] Metrics export failed: {e}")
+
+
+def _durability_barrier(job_id, writer):
+    """
+    Journal barrier: visits are checkpointed only after the job's pages
+    left the compare pool and their rows were written.
+    """
+    failed_seen = [0]
+
+    def barrier():
+        if CRAWL_MODE == "COMPARE":
+            COMPARE_POOL.barrier(job_id)
+        failed = writer.sync()
+        durable = failed == failed_seen[0]
+        failed_seen[0] = failed
+        return durable
+
+    return barrier
+
+
+def _print_stage_times(metrics, top=8):
+    """Stages of the job ranked by total time spent in them."""
+    stages = metrics.summary()["stages"]
+    if not stages:
+        return
+    print("Stage times       : total / p50 / p99 (count)")
+    for name, s in sorted(stages.items(), key=lambda kv: -kv[1]["total_s"])[:top]:
+        print(
+            f"  {name:<16}: {s['total_s']:.2f}s / {s['p50_ms']:.0f}ms / "
+            f"{s['p99_ms']:.0f}ms ({s['count']})"
+        )
+
+
+def _job_memory(waiting, persistent, canonicalizer, block_report) -> str:
+    """
+    Bytes held by the job's compact URL sets (frontier seen-check,
+    journal wrapper, canonicalizer) and block report, plus process peak
+    RSS. The Frontier's own bookkeeping is not measured.
+    """
+    job_bytes = (
+        waiting.memory_bytes()
+        + canonicalizer.memory_bytes()
+        + block_report.memory_bytes()
+    )
+    if persistent is not None:
+        job_bytes += persistent.memory_bytes()
+    text = f"{job_bytes / 1024:.1f} KiB"
+    if resource is not None:
+        # ru_maxrss is KiB on Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        text += f" (process peak RSS {peak / 1024:.1f} MiB)"
+    return text
+
 
-            print("\n" + "-" * 60)
-            print("CRAWL COMPLETED")
-            print("-" * 60)
-            print(f"Job ID            : {job_id}")
-            print(f"Customer ID       : {custid}")
-            print(f"Site ID           : {siteid}")
-            print(f"Seed URL          : {start_url}")
-            print(f"Total URLs visited: {stats['visited_count']}")
-            print(f"Crawl duration    : {duration:.2f} seconds")
-            print(f"Workers used      : {len(workers)}")
-            print("-" * 60)
-
-        except Exception as e:
-            fail_crawl_job(job_id, str(e))
-            print(f"ERROR: Crawl job {job_id} failed: {e}")
-            raise
+# ============================================================
+# MAIN
+# ============================================================
+
+def main():
+    # ---------------- DB CHECK ----------------
+    if not check_db_health():
+        print("ERROR: MySQL health check failed.")
+        return
+
+    print("MySQL health check passed.")
+
+    if CRAWL_MODE in ("BASELINE", "COMPARE"):
+        # Validators are written by BASELINE and read by COMPARE only
+        ensure_validators_table()
+
+    sites = fetch_enabled_sites()
+    if not sites:
+        print("No enabled sites found.")
+        return
+
+    print(f"Found {len(sites)} enabled site(s).")
+    print(
+        f"Crawling up to {SITE_CONCURRENCY} site(s) at once, "
+        f"{GLOBAL_WORKER_BUDGET} worker(s) in total."
+    )
+    if CRAWL_ENGINE != "ASYNC" and GLOBAL_WORKER_BUDGET <= SITE_CONCURRENCY * MIN_WORKERS:
+        print(
+            f"WARNING: GLOBAL_WORKER_BUDGET ({GLOBAL_WORKER_BUDGET}) leaves no room above "
+            f"{SITE_CONCURRENCY} x MIN_WORKERS ({MIN_WORKERS}); sites will not scale up."
+        )
+
+    # ---------------- SITES IN PARALLEL ----------------
+    budget = WorkerBudget(GLOBAL_WORKER_BUDGET)
+    cycle_start = time.time()
+    results = []
+    failures = []
+
+    with ThreadPoolExecutor(max_workers=SITE_CONCURRENCY, thread_name_prefix="Site") as pool:
+        futures = {pool.submit(crawl_site, site, budget): site for site in sites}
+        for fut in as_completed(futures):
+            try:
+                results.append(fut.result())
+            except Exception as e:
+                failures.append((futures[fut]["siteid"], e))
+
+    COMPARE_POOL.shutdown()
+    makespan = time.time() - cycle_start
+    serial_time = sum(r["duration"] for r in results)
+
+    print("\n" + "=" * 60)
+    print("CYCLE SUMMARY")
+    print("=" * 60)
+    print(f"Sites completed   : {len(results)}")
+    print(f"Sites failed      : {len(failures)}")
+    print(f"Pages crawled     : {sum(r['pages'] for r in results)}")
+    print(f"DB write failures : {sum(r['db_write_failures'] for r in results)}")
+    print(f"Cycle makespan    : {makespan:.2f} seconds")
+    print(f"Sum of site times : {serial_time:.2f} seconds")
+    if makespan > 0:
+        print(f"Parallel speedup  : {serial_time / makespan:.2f}x")
+    print("=" * 60)
+
+    if failures:
+        siteid, first = failures[0]
+        raise RuntimeError(f"{len(failures)} site crawl(s) failed; first (site {siteid}): {first}") from first
 
     print("\nAll site crawls completed successfully.")
 
@@ -191,7 +558,9 @@ if __name__ == "__main__":
         print("\n" + "=" * 60)
         print("BLOCKED URL REPORT")
         print("=" * 60)
-        for block_type, urls in BLOCK_REPORT.items():
-            print(f"[{block_type}] {len(urls)} URLs blocked")
+        for block_type, count in BLOCK_REPORT.totals().items():
+            print(f"[{block_type}] {count} URLs blocked")
+            for u in BLOCK_REPORT.samples.get(block_type, []):
+                print(f"    e.g. {u}")
         print("=" * 60)
         print("=" * 60)